@@ -0,0 +1,68 @@
+'''
+Compare two benchmark results written by ``benchmarks/run.py``.
+
+Exits with status 1 when a scenario's median latency grew by more than ``--threshold``
+percent, or when it runs more SQL statements than before::
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+'''
+import argparse
+import json
+import sys
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)["results"]
+
+
+def compare(before, after, threshold):
+    '''Return the comparison rows and the names of the scenarios that regressed.'''
+    rows = []
+    regressions = []
+    for name in sorted(set(before) | set(after)):
+        if name not in before or name not in after:
+            rows.append((name, before.get(name, {}).get("median_us"),
+                         after.get(name, {}).get("median_us"), None, ""))
+            continue
+        old, new = before[name], after[name]
+        change = (new["median_us"] - old["median_us"]) / old["median_us"] * 100
+        notes = []
+        if change > threshold:
+            notes.append("slower")
+        if new.get("queries", 0) > old.get("queries", 0):
+            notes.append(f"queries {old['queries']} -> {new['queries']}")
+        if notes:
+            regressions.append(name)
+        rows.append((name, old["median_us"], new["median_us"], change, ", ".join(notes)))
+    return rows, regressions
+
+
+def format_value(value, suffix=""):
+    return "-" if value is None else f"{value:.1f}{suffix}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10,
+                        help="The median latency increase, in percent, reported as a regression")
+    args = parser.parse_args(argv)
+
+    rows, regressions = compare(load_results(args.before), load_results(args.after),
+                                args.threshold)
+    print(f"{'scenario':<32} {'before us':>10} {'after us':>10} {'change':>8}")
+    for name, old, new, change, notes in rows:
+        print(
+            f"{name:<32} {format_value(old):>10} {format_value(new):>10}"
+            f" {format_value(change, '%'):>8} {notes}"
+        )
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
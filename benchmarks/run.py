@@ -0,0 +1,272 @@
+'''
+Measure the per-request overhead of chalice_plus views against bare Chalice routes.
+
+Every scenario sends requests through ``chalice.test.Client`` to an app backed by an
+in-memory SQLite database holding ``rows`` books, and records the latency and the
+number of SQL statements of each request. Results are written as JSON, to be compared
+between releases with ``benchmarks/compare.py``::
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --rows 10,100 --filter list --output after.json
+    python -m benchmarks.compare before.json after.json
+'''
+import argparse
+import base64
+import json
+import platform
+import statistics
+import sys
+import time
+
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+
+from chalice import Chalice
+from chalice.test import Client
+from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+from chalice_plus.permissions import IsAuthenticated
+from chalice_plus.urls import register_url
+from chalice_plus.views import CreateListView, ListView, RetrieveUpdateDeleteView, RetrieveView
+
+from tests.app.authenticators import CustomCognitoAuthenticator
+from tests.app.models import Author, Base, Book, User
+from tests.app.schemas import BookSchema
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+MASK = "{id,title}"
+
+
+class FlatBookSchema(SQLAlchemyAutoSchema):
+    class Meta:
+        model = Book
+        load_instance = True
+        include_fk = True
+
+
+def get_token(user_id):
+    payload = base64.urlsafe_b64encode(json.dumps({"sub": user_id}).encode("utf-8"))
+    return f"Bearer X.{payload.decode('utf-8')}"
+
+
+def create_app(rows):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        session.add_all([User(id=1, username="monkey"), User(id=2, username="horse")])
+        session.add_all([
+            Author(id=index, name=f"Author {index}", description="", created_by_id=1)
+            for index in range(1, 11)
+        ])
+        session.add_all([
+            Book(
+                id=index,
+                title=f"Book {index}",
+                description="A book" * 10,
+                author_id=index % 10 + 1,
+                created_by_id=index % 2 + 1,
+            )
+            for index in range(1, rows + 1)
+        ])
+        session.commit()
+
+    app = Chalice(app_name="benchmarks")
+    app.engine = engine
+
+    @app.route("bare/empty")
+    def bare_empty():
+        return {}
+
+    @app.route("bare/books/{id}")
+    def bare_retrieve(id):
+        with Session(engine) as session:
+            book = session.get(Book, int(id))
+            return {"id": book.id, "title": book.title, "description": book.description}
+
+    @app.route("bare/books")
+    def bare_list():
+        with Session(engine) as session:
+            return [
+                {"id": book.id, "title": book.title, "description": book.description}
+                for book in session.scalars(select(Book))
+            ]
+
+    class BookCreateListView(CreateListView):
+        model = Book
+        schema_class = BookSchema
+
+        def load_object(self, *args, **kwargs):
+            obj = super().load_object(*args, **kwargs)
+            obj.created_by_id = 1
+            return obj
+
+    class BookDetailView(RetrieveUpdateDeleteView):
+        model = Book
+        schema_class = BookSchema
+
+    class FlatBookListView(ListView):
+        model = Book
+        schema_class = FlatBookSchema
+
+    class FlatBookDetailView(RetrieveView):
+        model = Book
+        schema_class = FlatBookSchema
+
+    class AuthenticatedBookDetailView(RetrieveView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        permission_classes = {"get": [IsAuthenticated]}
+
+    register_url(app, "books", BookCreateListView.as_view())
+    register_url(app, "books/{int:id}", BookDetailView.as_view())
+    register_url(app, "flat/books", FlatBookListView.as_view())
+    register_url(app, "flat/books/{int:id}", FlatBookDetailView.as_view())
+    register_url(app, "auth/books/{int:id}", AuthenticatedBookDetailView.as_view())
+    return app, engine
+
+
+def insert_book(engine):
+    with Session(engine) as session:
+        book = Book(title="Disposable", description="", author_id=1, created_by_id=1)
+        session.add(book)
+        session.commit()
+        return book.id
+
+
+def get_scenarios(engine):
+    '''
+    Return the scenarios as ``(name, setup)`` pairs, ``setup()`` returning the
+    arguments of the request to time.
+    '''
+    create_body = json.dumps({"title": "New", "description": "A new book", "author_id": 1})
+    return [
+        ("bare_empty", lambda: ("GET", "bare/empty", {}, None)),
+        ("bare_retrieve", lambda: ("GET", "bare/books/1", {}, None)),
+        ("bare_list", lambda: ("GET", "bare/books", {}, None)),
+        ("retrieve", lambda: ("GET", "books/1", {}, None)),
+        ("retrieve_masked", lambda: ("GET", "books/1", {"X-Fields": MASK}, None)),
+        ("retrieve_flat", lambda: ("GET", "flat/books/1", {}, None)),
+        ("retrieve_auth", lambda: (
+            "GET", "auth/books/1", {"Authorization": get_token(1)}, None
+        )),
+        ("list", lambda: ("GET", "books", {}, None)),
+        ("list_masked", lambda: ("GET", "books", {"X-Fields": MASK}, None)),
+        ("list_flat", lambda: ("GET", "flat/books", {}, None)),
+        ("create", lambda: ("POST", "books", JSON_HEADERS, create_body)),
+        ("create_masked", lambda: (
+            "POST", "books", {**JSON_HEADERS, "X-Fields": "{id}"}, create_body
+        )),
+        ("update", lambda: ("PATCH", "books/1", JSON_HEADERS, '{"title": "Updated"}')),
+        ("delete", lambda: ("DELETE", f"books/{insert_book(engine)}", {}, None)),
+    ]
+
+
+def time_scenario(client, engine, setup, iterations, warmup):
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    timings = []
+    status_code = None
+    for index in range(warmup + iterations):
+        method, path, headers, body = setup()
+        event.listen(engine, "before_cursor_execute", count_statement)
+        statements.clear()
+        start = time.perf_counter_ns()
+        response = client.http.request(method, path, headers=headers, body=body or b"")
+        elapsed = time.perf_counter_ns() - start
+        event.remove(engine, "before_cursor_execute", count_statement)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} failed: {response.status_code} {response.body}")
+        status_code = response.status_code
+        if index >= warmup:
+            timings.append(elapsed / 1000)
+
+    timings.sort()
+    return {
+        "status_code": status_code,
+        "queries": len(statements),
+        "mean_us": round(statistics.fmean(timings), 1),
+        "median_us": round(statistics.median(timings), 1),
+        "p95_us": round(timings[int(len(timings) * 0.95) - 1], 1),
+        "min_us": round(timings[0], 1),
+    }
+
+
+def time_registration(iterations):
+    '''Time parsing a route and registering a view, which happens on every cold start.'''
+    timings = []
+    for _ in range(iterations):
+        app = Chalice(app_name="registration")
+        start = time.perf_counter_ns()
+        for index in range(10):
+            register_url(app, f"books{index}/{{int:id}}", RetrieveUpdateDeleteView.as_view())
+        timings.append((time.perf_counter_ns() - start) / 10 / 1000)
+    return {
+        "mean_us": round(statistics.fmean(timings), 1),
+        "median_us": round(statistics.median(timings), 1),
+        "min_us": round(min(timings), 1),
+    }
+
+
+def get_versions():
+    versions = {"python": platform.python_version()}
+    for package in ("chalice", "chalice-plus", "marshmallow", "marshmallow-sqlalchemy",
+                    "SQLAlchemy", "orjson"):
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def run(rows, iterations, warmup, name_filter=None):
+    results = {"registration": time_registration(iterations)}
+    for row_count in rows:
+        app, engine = create_app(row_count)
+        with Client(app) as client:
+            for name, setup in get_scenarios(engine):
+                if name_filter and name_filter not in name:
+                    continue
+                key = f"{name}[rows={row_count}]"
+                results[key] = time_scenario(client, engine, setup, iterations, warmup)
+                print(
+                    f"{key:<32} {results[key]['median_us']:>10.1f} us"
+                    f" {results[key]['queries']:>4} queries",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", default="10,100,1000",
+                        help="Comma separated numbers of books to run the scenarios with")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--filter", help="Only run the scenarios whose name contains this")
+    parser.add_argument("--output", help="The JSON file to write, stdout by default")
+    args = parser.parse_args(argv)
+
+    rows = [int(row_count) for row_count in args.rows.split(",")]
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "platform": platform.platform(),
+        "versions": get_versions(),
+        "settings": {"rows": rows, "iterations": args.iterations, "warmup": args.warmup},
+        "results": run(rows, args.iterations, args.warmup, args.filter),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
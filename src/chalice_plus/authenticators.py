@@ -1,16 +1,106 @@
 import base64
 import binascii
+import hashlib
+import hmac
 import json
+import threading
+import time
 
 from functools import cached_property
 
 from chalice.app import UnauthorizedError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from chalice_plus.cache import TTLCache
+
+# ASN.1 DigestInfo prefix for SHA-256, used by RSASSA-PKCS1-v1_5 signatures (RFC 8017)
+SHA256_DIGEST_INFO = bytes.fromhex("3031300d060960864801650304020105000420")
+
+
+class UserCache:
+    '''
+    A per-container cache of users, so authenticated requests don't have to load the
+    user from the database every time.
+
+    Only the user's column values are cached, not the instance: each request gets its
+    own copy, attached to the request's session without a query. Attributes that
+    weren't cached (relationships, or columns left out of ``attributes``) are loaded
+    from the database when they are first accessed.
+
+    Changes made to a user are only visible once its cache entry is invalidated or has
+    expired, see ``invalidate`` and ``invalidate_on_change``.
+
+    :param int maxsize: The maximum number of users to hold
+    :param float ttl: The number of seconds a user is cached for
+    :param attributes: The names of the column attributes to cache (e.g. the ones the
+        permission classes use). Defaults to every loaded column.
+    '''
+    def __init__(self, maxsize=1024, ttl=300, attributes=None):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.attributes = attributes
+
+    def get(self, session, user_id):
+        '''Return the cached user attached to ``session``, or ``None``.'''
+        entry = self.cache.get(str(user_id))
+        if entry is None:
+            return None
+        mapper, values = entry
+        user = mapper.class_manager.new_instance()
+        for key, value in values.items():
+            set_committed_value(user, key, value)
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+
+    def set(self, user_id, user):
+        state = inspect(user)
+        keys = self.attributes or [prop.key for prop in state.mapper.column_attrs]
+        values = {key: state.dict[key] for key in keys if key in state.dict}
+        self.cache.set(str(user_id), (state.mapper, values))
+
+    def invalidate(self, user_id):
+        self.cache.delete(str(user_id))
+
+    def clear(self):
+        self.cache.clear()
+
+    def invalidate_on_change(self, model, user_id_attribute="id"):
+        '''
+        Invalidate users whenever they are updated or deleted through the ORM.
+
+        Bulk ``UPDATE``/``DELETE`` statements don't go through the ORM and have to be
+        followed by ``invalidate`` (or ``clear``).
+
+        :param model: The user model
+        :param str user_id_attribute: The attribute holding the id found in the token
+        '''
+        def on_update(mapper, connection, target):
+            # Also called when only a relationship changed (e.g. a backref was appended to)
+            state = inspect(target)
+            if any(state.attrs[prop.key].history.has_changes() for prop in mapper.column_attrs):
+                self.invalidate(getattr(target, user_id_attribute))
+
+        def on_delete(mapper, connection, target):
+            self.invalidate(getattr(target, user_id_attribute))
+
+        event.listen(model, "after_update", on_update)
+        event.listen(model, "after_delete", on_delete)
 
 
 class CognitoAuthenticator:
+    # Set to a UserCache to reuse users across requests
+    user_cache = None
+
     def __init__(self, request, session):
         self.request = request
-        self.session = session
+        self._session = session
+
+    @cached_property
+    def session(self):
+        # Views pass a callable, so that checking the token's claims never creates the
+        # session (and the engine)
+        return self._session() if callable(self._session) else self._session
 
     @cached_property
     def jwt_payload(self):
@@ -39,7 +129,14 @@ class CognitoAuthenticator:
 
     @cached_property
     def user(self):
-        return self.get_user()
+        if self.user_cache is None or self.user_id is None:
+            return self.get_user()
+        user = self.user_cache.get(self.session, self.user_id)
+        if user is None:
+            user = self.get_user()
+            if user is not None:
+                self.user_cache.set(self.user_id, user)
+        return user
 
     def get_user_id(self):
         if self.jwt_payload:
@@ -48,3 +145,201 @@ class CognitoAuthenticator:
     @cached_property
     def user_id(self):
         return self.get_user_id()
+
+    def get_groups(self):
+        if self.jwt_payload:
+            return set(self.jwt_payload.get("cognito:groups", []))
+        return set()
+
+    @cached_property
+    def groups(self):
+        return self.get_groups()
+
+
+def get_cognito_jwks_url(region, user_pool_id):
+    return f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json"
+
+
+def get_cognito_issuer(region, user_pool_id):
+    return f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+
+
+class KeySource:
+    '''
+    A JSON Web Key Set, loaded once and cached for ``ttl`` seconds.
+
+    When a token is signed with an unknown key id, the key set is reloaded (at most
+    once every ``refresh_interval`` seconds) to pick up rotated keys.
+    '''
+    ttl = 24 * 60 * 60
+    refresh_interval = 60
+
+    def __init__(self):
+        self._keys = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        '''Return the key set as a JWKS dict, e.g. ``{"keys": [...]}``.'''
+        raise NotImplementedError
+
+    def get_keys(self, refresh=False):
+        with self._lock:
+            age = time.time() - self._loaded_at
+            if self._keys is None or age > self.ttl or (refresh and age > self.refresh_interval):
+                self._keys = {
+                    key["kid"]: key for key in self.load().get("keys", []) if "kid" in key
+                }
+                self._loaded_at = time.time()
+            return self._keys
+
+    def get_key(self, kid):
+        key = self.get_keys().get(kid)
+        if key is None:
+            key = self.get_keys(refresh=True).get(kid)
+        return key
+
+
+class URLKeySource(KeySource):
+    '''Fetch the key set over HTTP, e.g. from a Cognito user pool (see ``for_cognito``).'''
+    def __init__(self, url, timeout=5):
+        super().__init__()
+        self.url = url
+        self.timeout = timeout
+
+    @classmethod
+    def for_cognito(cls, region, user_pool_id, **kwargs):
+        return cls(get_cognito_jwks_url(region, user_pool_id), **kwargs)
+
+    def load(self):
+        # Only needed when the keys are fetched, and slow to import
+        from urllib.request import urlopen
+
+        with urlopen(self.url, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+
+class FileKeySource(KeySource):
+    '''Read the key set from a local JSON file, e.g. for offline testing.'''
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def load(self):
+        with open(self.path) as jwks_file:
+            return json.load(jwks_file)
+
+
+class StaticKeySource(KeySource):
+    '''Use a key set given as a dict.'''
+    def __init__(self, jwks):
+        super().__init__()
+        self.jwks = jwks
+
+    def load(self):
+        return self.jwks
+
+
+def base64url_decode(value):
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def base64url_to_int(value):
+    return int.from_bytes(base64url_decode(value), "big")
+
+
+def verify_rs256(message, signature, jwk):
+    '''Verify an RSASSA-PKCS1-v1_5 SHA-256 signature against an RSA JSON Web Key.'''
+    n = base64url_to_int(jwk["n"])
+    e = base64url_to_int(jwk["e"])
+    size = (n.bit_length() + 7) // 8
+    if len(signature) != size:
+        return False
+    signature_int = int.from_bytes(signature, "big")
+    if signature_int >= n:
+        return False
+    encoded = pow(signature_int, e, n).to_bytes(size, "big")
+
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+    padding = b"\xff" * (size - len(digest_info) - 3)
+    expected = b"\x00\x01" + padding + b"\x00" + digest_info
+    return hmac.compare_digest(encoded, expected)
+
+
+class VerifiedCognitoAuthenticator(CognitoAuthenticator):
+    '''
+    A ``CognitoAuthenticator`` that verifies the token's signature and claims.
+
+    Verified payloads are cached per container until the token expires, keyed by a
+    hash of the token, so repeated requests with the same token skip the signature
+    check entirely.
+
+    Set ``key_source`` to where the user pool's keys can be found, e.g.
+    ``URLKeySource.for_cognito(region, user_pool_id)``, and ``issuer`` to the user
+    pool's issuer. ``client_ids`` and ``token_use`` optionally restrict which app
+    clients and token types ("access" or "id") are accepted.
+    '''
+    key_source = None
+    issuer = None
+    client_ids = None
+    token_use = None
+    leeway = 0
+    token_cache = TTLCache(maxsize=1024)
+
+    def _decode_jwt_payload(self, jwt):
+        token = jwt[7:] if jwt[:7].lower() == "bearer " else jwt
+        cache_key = (type(self), hashlib.sha256(token.encode("utf-8")).digest())
+        payload = self.token_cache.get(cache_key)
+        if payload is None:
+            payload = self._verify_jwt(token)
+            self.token_cache.set(cache_key, payload, expires_at=payload["exp"] + self.leeway)
+        return payload
+
+    def _verify_jwt(self, token):
+        assert self.key_source is not None, (
+            "'%s' should include a `key_source` attribute." % self.__class__.__name__
+        )
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            header = json.loads(base64url_decode(header_segment))
+            payload = json.loads(base64url_decode(payload_segment))
+            signature = base64url_decode(signature_segment)
+        except (ValueError, binascii.Error):
+            raise UnauthorizedError("Unauthorized")
+
+        if not isinstance(header, dict) or header.get("alg") != "RS256":
+            raise UnauthorizedError("Unauthorized")
+        # The key id comes from the token, so it can be anything JSON can hold
+        kid = header.get("kid")
+        if not isinstance(kid, str):
+            raise UnauthorizedError("Unauthorized")
+        key = self.key_source.get_key(kid)
+        if key is None or key.get("kty") != "RSA":
+            raise UnauthorizedError("Unauthorized")
+        message = f"{header_segment}.{payload_segment}".encode("ascii")
+        try:
+            verified = verify_rs256(message, signature, key)
+        except (KeyError, TypeError, ValueError, AttributeError, binascii.Error):
+            # A malformed key, e.g. without a modulus or exponent
+            verified = False
+        if not verified:
+            raise UnauthorizedError("Unauthorized")
+
+        if not isinstance(payload, dict) or not self.validate_claims(payload):
+            raise UnauthorizedError("Unauthorized")
+        return payload
+
+    def validate_claims(self, payload):
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or exp + self.leeway <= time.time():
+            return False
+        if self.issuer and payload.get("iss") != self.issuer:
+            return False
+        if self.token_use and payload.get("token_use") != self.token_use:
+            return False
+        if self.client_ids:
+            # Access tokens carry the app client in "client_id", id tokens in "aud"
+            client_id = payload.get("client_id", payload.get("aud"))
+            if client_id not in self.client_ids:
+                return False
+        return True
@@ -0,0 +1,267 @@
+import json
+import threading
+import time
+import weakref
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    '''
+    A bounded least recently used cache.
+
+    Module level instances live for the lifetime of the Lambda container, so values
+    are reused across warm invocations. Reading and writing entries is thread safe,
+    but the values themselves are shared: only cache values that aren't mutated
+    once built.
+
+    :param int maxsize: The maximum number of entries to hold
+    '''
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        '''Return the cached value for ``key``, calling ``factory()`` to create it if missing.'''
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    '''
+    A bounded LRU cache whose entries expire.
+
+    :param int maxsize: The maximum number of entries to hold
+    :param float ttl: The default number of seconds an entry lives for
+    '''
+    _missing = object()
+
+    def __init__(self, maxsize=128, ttl=300):
+        super().__init__(maxsize=maxsize)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        entry = super().get(key, self._missing)
+        if entry is self._missing:
+            return default
+        value, expires_at = entry
+        if expires_at <= time.time():
+            self.delete(key)
+            return default
+        return value
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        '''
+        Cache a value for ``ttl`` seconds (the cache's default if not given), or until
+        the ``expires_at`` timestamp.
+        '''
+        if expires_at is None:
+            expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        super().set(key, (value, expires_at))
+
+    def __contains__(self, key):
+        return self.get(key, self._missing) is not self._missing
+
+
+class CacheBackend:
+    '''
+    Storage for cached responses.
+
+    Besides the entries themselves, a backend holds a generation counter per model,
+    which is part of every key and bumped on writes: entries cached before a write are
+    never read again and age out on their own. Shared backends (e.g. Redis or DynamoDB)
+    make a write in one container invalidate the entries of every container.
+    '''
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get_generation(self, name):
+        raise NotImplementedError
+
+    def incr_generation(self, name):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    '''
+    A bounded per-container cache.
+
+    :param int maxsize: The maximum number of responses to hold
+    '''
+    def __init__(self, maxsize=1024):
+        self.cache = TTLCache(maxsize=maxsize)
+        # Kept apart from the entries: an evicted counter would start over and bring
+        # back stale entries
+        self.generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, ttl=ttl)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+    def get_generation(self, name):
+        return self.generations.get(name, 0)
+
+    def incr_generation(self, name):
+        with self._lock:
+            self.generations[name] = self.generations.get(name, 0) + 1
+            return self.generations[name]
+
+
+class SQLiteBackend(CacheBackend):
+    '''
+    A cache shared by the processes of one machine through a SQLite file, standing in
+    for a shared backend in local development and tests.
+
+    :param str path: The database file
+    '''
+    def __init__(self, path):
+        import sqlite3
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_generations "
+                "(name TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+
+    def execute(self, statement, parameters=()):
+        with self._lock:
+            return self.connection.execute(statement, parameters).fetchone()
+
+    def get(self, key):
+        row = self.execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        )
+        if row is not None:
+            return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        self.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl),
+        )
+
+    def delete(self, key):
+        self.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self.execute("DELETE FROM cache_entries")
+
+    def get_generation(self, name):
+        row = self.execute("SELECT generation FROM cache_generations WHERE name = ?", (name,))
+        return row[0] if row else 0
+
+    def incr_generation(self, name):
+        row = self.execute(
+            "INSERT INTO cache_generations (name, generation) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET generation = generation + 1 "
+            "RETURNING generation",
+            (name,),
+        )
+        return row[0]
+
+
+# The backends used by cache policies, whose generations are bumped on writes
+backends = weakref.WeakSet()
+
+default_backend = MemoryBackend()
+
+
+def get_model_name(model):
+    return f"{model.__module__}.{model.__qualname__}"
+
+
+def invalidate(*models):
+    '''
+    Invalidate the cached responses built from ``models``.
+
+    Views call this after their writes; call it after writing to these models
+    elsewhere (scripts, bulk statements run outside the views...).
+    '''
+    for backend in list(backends):
+        for model in models:
+            backend.incr_generation(get_model_name(model))
+
+
+class CachePolicy:
+    '''
+    How a view caches its GET responses.
+
+    Successful responses are cached per route, query string, field mask and the
+    values of ``vary_on``, and are served without touching the database until they
+    expire or a write invalidates them.
+
+    :param float ttl: The number of seconds a response is cached for
+    :param vary_on: What else responses differ by: ``"user"`` (the authenticated user's
+        id), ``"groups"`` (their groups) or callables taking the view
+    :param depends_on: Other models included in the responses (e.g. nested ones), whose
+        writes invalidate them too
+    :param backend: A ``CacheBackend``, the per-container ``default_backend`` by default
+    '''
+    def __init__(self, ttl=60, vary_on=(), depends_on=(), backend=None):
+        for item in vary_on:
+            assert item in ("user", "groups") or callable(item), (
+                "Unknown `vary_on` value '%s'." % item
+            )
+        self.ttl = ttl
+        self.vary_on = tuple(vary_on)
+        self.depends_on = tuple(depends_on)
+        self.backend = default_backend if backend is None else backend
+        backends.add(self.backend)
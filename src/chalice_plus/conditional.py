@@ -0,0 +1,69 @@
+import hashlib
+
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+def make_etag(value, weak=False):
+    '''Return an ETag for a string: the body itself (strong) or a version of it (weak).'''
+    digest = hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+    if weak:
+        return f'W/"{digest}"'
+    return f'"{digest}"'
+
+
+def etag_matches(etag, if_none_match):
+    '''Compare an ETag to an ``If-None-Match`` header, with the weak comparison of RFC 7232.'''
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def to_utc(value):
+    # Naive datetimes are assumed to be in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value):
+    return format_datetime(to_utc(value), usegmt=True)
+
+
+def parse_http_date(value):
+    try:
+        return to_utc(parsedate_to_datetime(value))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def is_not_modified(headers, etag=None, last_modified=None):
+    '''
+    Check the request's ``If-None-Match`` / ``If-Modified-Since`` headers against the
+    current representation, i.e. whether a 304 can be sent.
+
+    ``If-Modified-Since`` is ignored when ``If-None-Match`` is present.
+    '''
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and etag_matches(etag, if_none_match)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        since = parse_http_date(if_modified_since)
+        # HTTP dates have a precision of one second
+        return since is not None and to_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def get_validator_headers(etag=None, last_modified=None):
+    headers = {}
+    if etag is not None:
+        headers["ETag"] = etag
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
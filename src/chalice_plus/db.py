@@ -0,0 +1,163 @@
+import weakref
+
+from functools import cached_property
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+POOL_RECYCLE = 300
+PROXY_POOL_RECYCLE = 60
+
+# Pool statistics for engines built by create_lambda_engine
+_pool_statistics = weakref.WeakKeyDictionary()
+
+
+class PoolStatistics:
+    '''Counts connection pool events for an engine.'''
+    def __init__(self, engine):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def as_dict(self, engine):
+        pool = engine.pool
+        stats = {
+            "pool": type(pool).__name__,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+        }
+        if hasattr(pool, "checkedout"):
+            stats["checked_out"] = pool.checkedout()
+            stats["size"] = pool.size()
+        return stats
+
+
+def is_memory_database(url):
+    # In-memory SQLite needs SQLAlchemy's default pool to keep a single database
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def create_lambda_engine(
+    url,
+    proxy=False,
+    pool_pre_ping=True,
+    pool_recycle=None,
+    **kwargs
+):
+    '''
+    Create an engine configured for AWS Lambda.
+
+    A Lambda container serves one request at a time, so the pool holds a single
+    connection which is kept open between warm invocations, checked with a cheap ping
+    before each use (the container may have been frozen for a while) and recycled
+    every ``pool_recycle`` seconds.
+
+    :param url: the database URL
+    :param bool proxy: set when connecting through RDS Proxy or pgbouncer. The
+        connection to the proxy is still kept between invocations, but recycled after a
+        minute by default, so that frozen containers don't hold on to the proxy's client
+        connections for long. Prepared statements are disabled for psycopg (3), as they
+        break with pgbouncer's transaction pooling; psycopg2 doesn't use them.
+    :param pool_recycle: the connection's maximum age in seconds, by default 300 (60
+        with ``proxy``)
+    :param kwargs: any other ``create_engine`` arguments, which take precedence
+    '''
+    url = make_url(url)
+    engine = create_engine(
+        url, **get_lambda_engine_options(url, proxy, pool_pre_ping, pool_recycle, **kwargs)
+    )
+    _pool_statistics[engine] = PoolStatistics(engine)
+    return engine
+
+
+def get_lambda_engine_options(url, proxy=False, pool_pre_ping=True, pool_recycle=None, **kwargs):
+    '''Return the ``create_engine`` arguments of ``create_lambda_engine``.'''
+    url = make_url(url)
+    options = {}
+    connect_args = {}
+    if pool_recycle is None:
+        pool_recycle = PROXY_POOL_RECYCLE if proxy else POOL_RECYCLE
+    if not is_memory_database(url):
+        options.update(
+            pool_size=1,
+            max_overflow=0,
+            pool_pre_ping=pool_pre_ping,
+            pool_recycle=pool_recycle,
+        )
+    if proxy and url.get_driver_name() == "psycopg":
+        # pgbouncer's transaction pooling may run each statement on another server
+        # connection, where the statements psycopg prepared don't exist
+        connect_args["prepare_threshold"] = None
+    connect_args.update(kwargs.pop("connect_args", {}))
+    if connect_args:
+        options["connect_args"] = connect_args
+    options.update(kwargs)
+    return options
+
+
+def get_pool_stats(engine):
+    '''Return connection pool statistics for an engine built by ``create_lambda_engine``.'''
+    if isinstance(engine, LambdaEngine):
+        return engine.get_pool_stats()
+    return _pool_statistics[engine].as_dict(engine)
+
+
+class LambdaEngine:
+    '''
+    An engine that is only created when the first request needs the database.
+
+    Creating an engine imports the dialect and DBAPI driver, so deferring it keeps
+    them out of the cold start of requests that never touch the database.
+
+    :param url: the database URL, or a callable returning it (e.g. reading settings
+        that are only available at runtime)
+    :param kwargs: arguments for ``create_lambda_engine``
+    '''
+    def __init__(self, url, **kwargs):
+        self.url = url
+        self.kwargs = kwargs
+
+    @cached_property
+    def engine(self):
+        url = self.url() if callable(self.url) else self.url
+        return create_lambda_engine(url, **self.kwargs)
+
+    @property
+    def created(self):
+        return "engine" in self.__dict__
+
+    def get_pool_stats(self):
+        if not self.created:
+            return {"pool": None, "connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+        return get_pool_stats(self.engine)
+
+    def dispose(self):
+        if self.created:
+            self.engine.dispose()
+
+
+def get_engine(app):
+    '''Return the SQLAlchemy engine attached to the app.'''
+    engine = app.engine
+    if isinstance(engine, LambdaEngine):
+        return engine.engine
+    return engine
@@ -9,9 +9,18 @@ from pathlib import Path
 LAMBDA_FILES = (
     "__init__.py",
     "authenticators.py",
+    "cache.py",
+    "conditional.py",
+    "db.py",
     "exceptions.py",
+    "filters.py",
+    "instrumentation.py",
+    "loading.py",
     "masking.py",
+    "nplusone.py",
+    "pagination.py",
     "permissions.py",
+    "serializers.py",
     "urls.py",
     "views.py",
 )
@@ -0,0 +1,172 @@
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from chalice.app import BadRequestError
+from sqlalchemy import inspect, or_
+
+LOOKUPS = {
+    "exact": lambda column, value: column == value,
+    "in": lambda column, values: column.in_(values),
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+}
+
+
+def get_column(view, field_name, attribute):
+    mapper = inspect(view.model)
+    assert field_name in mapper.columns, (
+        "'%s' lists '%s' in `%s` which is not a column on %s."
+        % (view.__class__.__name__, field_name, attribute, view.model.__name__)
+    )
+    return mapper.columns[field_name]
+
+
+def parse_value(column, value):
+    '''Convert a query string value to the python type of ``column``.'''
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is bool:
+        if value.lower() in ("true", "1"):
+            return True
+        if value.lower() in ("false", "0"):
+            return False
+        raise ValueError(value)
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type in (UUID, Decimal, int, float):
+        return python_type(value)
+    return value
+
+
+class BaseFilterBackend:
+    def __init__(self, view):
+        self.view = view
+        self.request = view.request
+
+    def get_query_param(self, name):
+        query_params = self.request.query_params or {}
+        return query_params.get(name)
+
+    def filter_queryset(self, queryset):
+        raise NotImplementedError
+
+
+class FieldFilter(BaseFilterBackend):
+    '''
+    Filter on the columns listed in the view's ``filter_fields``.
+
+    ``filter_fields`` is either a list of column names, which can only be matched
+    exactly (``?author_id=2``), or a dict of column names to the lookups allowed on
+    them: ``exact``, ``in`` (``?author_id__in=1,2``), ``gt``, ``gte``, ``lt`` and
+    ``lte`` (``?created_date__gte=2024-01-01``). Only list indexed columns.
+    '''
+    lookup_separator = "__"
+
+    def get_filter_fields(self):
+        filter_fields = getattr(self.view, "filter_fields", None) or {}
+        if not isinstance(filter_fields, dict):
+            filter_fields = {field_name: ["exact"] for field_name in filter_fields}
+        return filter_fields
+
+    def filter_queryset(self, queryset):
+        clauses = []
+        for field_name, lookups in self.get_filter_fields().items():
+            column = get_column(self.view, field_name, "filter_fields")
+            for lookup in lookups:
+                assert lookup in LOOKUPS, (
+                    "'%s' uses unknown lookup '%s'." % (self.view.__class__.__name__, lookup)
+                )
+                param = field_name
+                if lookup != "exact":
+                    param = f"{field_name}{self.lookup_separator}{lookup}"
+                raw_value = self.get_query_param(param)
+                if raw_value is None:
+                    continue
+                try:
+                    if lookup == "in":
+                        value = [parse_value(column, item) for item in raw_value.split(",")]
+                    else:
+                        value = parse_value(column, raw_value)
+                except (TypeError, ValueError, ArithmeticError):
+                    raise BadRequestError(f"Invalid {param}: {raw_value}")
+                clauses.append(LOOKUPS[lookup](column, value))
+
+        if clauses:
+            queryset = queryset.filter(*clauses)
+        return queryset
+
+
+class SearchFilter(BaseFilterBackend):
+    '''
+    Search the columns listed in the view's ``search_fields``, e.g. ``?search=hungry``.
+
+    Every word of the search has to match at least one of the fields. Fields are
+    matched case insensitively anywhere in the value, which can't use an index;
+    prefix a field with ``^`` to match the start of the value (``LIKE 'word%'``) or with
+    ``=`` to match it exactly, both of which can.
+    '''
+    search_query_param = "search"
+
+    def get_search_clause(self, field, term):
+        if field.startswith("^"):
+            column = get_column(self.view, field[1:], "search_fields")
+            return column.startswith(term, autoescape=True)
+        if field.startswith("="):
+            column = get_column(self.view, field[1:], "search_fields")
+            return column == term
+        column = get_column(self.view, field, "search_fields")
+        return column.icontains(term, autoescape=True)
+
+    def filter_queryset(self, queryset):
+        search_fields = getattr(self.view, "search_fields", None)
+        search = self.get_query_param(self.search_query_param)
+        if not search_fields or not search:
+            return queryset
+        for term in search.replace(",", " ").split():
+            queryset = queryset.filter(
+                or_(*[self.get_search_clause(field, term) for field in search_fields])
+            )
+        return queryset
+
+
+class OrderingFilter(BaseFilterBackend):
+    '''
+    Order by the view's ``ordering``, or by the one asked for with ``?ordering=-title``.
+
+    Clients can only order on the columns in the view's ``ordering_fields``, which
+    should be indexed.
+    '''
+    ordering_query_param = "ordering"
+
+    def get_ordering(self):
+        '''Return the ordering as a list of column names, prefixed with ``-`` if descending.'''
+        raw_ordering = self.get_query_param(self.ordering_query_param)
+        if raw_ordering:
+            ordering_fields = getattr(self.view, "ordering_fields", None) or ()
+            ordering = [term.strip() for term in raw_ordering.split(",") if term.strip()]
+            for term in ordering:
+                if term.lstrip("-") not in ordering_fields:
+                    raise BadRequestError(f"Invalid {self.ordering_query_param}: {term}")
+            if ordering:
+                return ordering
+
+        ordering = getattr(self.view, "ordering", None) or []
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        return list(ordering)
+
+    def filter_queryset(self, queryset):
+        columns = []
+        for term in self.get_ordering():
+            column = get_column(self.view, term.lstrip("-"), "ordering")
+            columns.append(column.desc() if term.startswith("-") else column.asc())
+        if columns:
+            queryset = queryset.order_by(*columns)
+        return queryset
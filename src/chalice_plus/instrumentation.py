@@ -0,0 +1,153 @@
+import json
+import time
+import weakref
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# The metrics of the request being dispatched, which queries are counted against
+current_metrics = ContextVar("chalice_plus_current_metrics", default=None)
+
+_instrumented_engines = weakref.WeakSet()
+
+# Not counted as queries, e.g. the BEGIN emitted by SQLAlchemy's recipe for SQLite savepoints
+TRANSACTION_STATEMENTS = frozenset(("BEGIN", "COMMIT", "ROLLBACK"))
+
+
+class RequestMetrics:
+    '''
+    Timings and query counts of a request.
+
+    Phases are timed separately and may overlap: queries run while loading the user
+    count towards both ``auth`` and ``db``.
+
+    :param str name: What is being measured, e.g. the view's name
+    '''
+    def __init__(self, name):
+        self.name = name
+        self.phases = {}
+        self.query_count = 0
+        self.query_time = 0.0
+        self.total = None
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record_query(self, duration):
+        self.query_count += 1
+        self.query_time += duration
+
+    def finish(self):
+        if self.total is None:
+            self.total = time.perf_counter() - self._start
+
+    def get_timings(self):
+        '''Return the duration of each phase, the queries and the request, in milliseconds.'''
+        self.finish()
+        timings = {name: duration * 1000 for name, duration in self.phases.items()}
+        timings["db"] = self.query_time * 1000
+        timings["total"] = self.total * 1000
+        return timings
+
+    def get_server_timing(self):
+        '''Return the metrics as a ``Server-Timing`` header value.'''
+        entries = []
+        for name, duration in self.get_timings().items():
+            entry = f"{name};dur={duration:.2f}"
+            if name == "db":
+                entry += f';desc="{self.query_count} queries"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+    def get_emf_record(self, namespace, dimensions=None, properties=None):
+        '''
+        Return the metrics as a CloudWatch Embedded Metric Format record, which
+        CloudWatch turns into metrics when it is written to the Lambda's logs.
+        '''
+        dimensions = {"View": self.name, **(dimensions or {})}
+        timings = {f"{name.capitalize()}Time": value for name, value in self.get_timings().items()}
+        metrics = [{"Name": name, "Unit": "Milliseconds"} for name in timings]
+        metrics.append({"Name": "QueryCount", "Unit": "Count"})
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": namespace,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": metrics,
+                }],
+            },
+            **dimensions,
+            **(properties or {}),
+            **{name: round(value, 3) for name, value in timings.items()},
+            "QueryCount": self.query_count,
+        }
+
+    def log_emf(self, namespace, dimensions=None, properties=None):
+        # EMF records have to be written to stdout as is, without a log prefix
+        print(json.dumps(self.get_emf_record(namespace, dimensions, properties)), flush=True)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("chalice_plus_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("chalice_plus_query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    metrics = current_metrics.get()
+    if metrics is not None and statement not in TRANSACTION_STATEMENTS:
+        metrics.record_query(duration)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("chalice_plus_query_start"):
+        connection.info["chalice_plus_query_start"].pop()
+
+
+def instrument_engine(engine):
+    '''Count and time the queries of ``engine`` against the current request's metrics.'''
+    if engine in _instrumented_engines:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    _instrumented_engines.add(engine)
+
+
+@contextmanager
+def assert_max_queries(engine, max_queries):
+    '''
+    Fail if the block runs more than ``max_queries`` statements on ``engine``, e.g.
+    to make sure an endpoint doesn't start loading relationships one row at a time::
+
+        with assert_max_queries(get_engine(app), 2):
+            client.http.get("books")
+
+    Yields the list of statements that were run.
+    '''
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement not in TRANSACTION_STATEMENTS:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert len(statements) <= max_queries, "%d queries were run, expected at most %d:\n%s" % (
+        len(statements), max_queries, "\n".join(statements)
+    )
@@ -0,0 +1,101 @@
+from marshmallow import fields
+from sqlalchemy import inspect
+from sqlalchemy.orm import (
+    ColumnProperty, RelationshipProperty, joinedload, load_only, selectinload
+)
+from sqlalchemy.orm.interfaces import MANYTOONE, ONETOMANY
+
+
+def get_field_property(mapper, field_name, field_obj):
+    '''Return the mapper property a schema field is dumped from, if there is one.'''
+    return mapper.attrs.get(field_obj.attribute or field_name)
+
+
+def get_nested_schema(field_obj):
+    '''Return the schema a ``Nested`` (or ``List(Nested)``) field dumps with.'''
+    if isinstance(field_obj, fields.List):
+        field_obj = field_obj.inner
+    if isinstance(field_obj, fields.Nested):
+        return field_obj.schema
+
+
+def get_projection(mapper, schema):
+    '''
+    Return the column properties needed to dump ``schema``.
+
+    Returns ``None`` when a field is not backed by a plain column or relationship
+    (e.g. a ``Method`` field or a dotted attribute), as there is no way to tell which
+    columns it will read.
+    '''
+    properties = set()
+    for field_name, field_obj in schema.dump_fields.items():
+        prop = get_field_property(mapper, field_name, field_obj)
+        if isinstance(prop, ColumnProperty):
+            properties.add(prop)
+        elif isinstance(prop, RelationshipProperty):
+            # Many-to-one relationships are lazy loaded from the local foreign key
+            if prop.direction is MANYTOONE:
+                for column in prop.local_columns:
+                    properties.add(mapper.get_property_by_column(column))
+        else:
+            return None
+    return properties
+
+
+def get_projection_options(model, schema, extra_columns=()):
+    '''Return ``load_only`` options so only the columns ``schema`` dumps are selected.'''
+    mapper = inspect(model)
+    properties = get_projection(mapper, schema)
+    if properties is None:
+        return []
+    # Always loaded, and all that's needed when only collections are dumped
+    for column in mapper.primary_key:
+        properties.add(mapper.get_property_by_column(column))
+    for column in extra_columns:
+        properties.add(mapper.get_property_by_column(column))
+    return [load_only(*[getattr(model, prop.key) for prop in properties])]
+
+
+def get_loader_options(model, schema, project=False, depth=3, extra_columns=()):
+    '''
+    Plan the loader options needed to dump ``schema`` in a fixed number of queries.
+
+    Every relationship that the schema will serialize is eager loaded: many-to-one
+    relationships are joined into the parent query and collections are fetched with
+    one ``SELECT ... WHERE fk IN (...)`` per relationship. Relationships left out of
+    the (masked) schema are not loaded at all.
+
+    :param model: the SQLAlchemy model being queried
+    :param schema: the dump schema, after masking
+    :param bool project: also restrict each query to the columns the schema dumps
+    :param int depth: how many levels of nested schemas to eager load
+    '''
+    options = []
+    if project:
+        options.extend(get_projection_options(model, schema, extra_columns))
+    if depth <= 0:
+        return options
+
+    mapper = inspect(model)
+    for field_name, field_obj in schema.dump_fields.items():
+        prop = get_field_property(mapper, field_name, field_obj)
+        if not isinstance(prop, RelationshipProperty):
+            continue
+
+        attribute = getattr(model, prop.key)
+        loader = selectinload(attribute) if prop.uselist else joinedload(attribute)
+        nested_schema = get_nested_schema(field_obj)
+        if nested_schema is not None:
+            # Collections are matched back to their parent on the child's foreign key
+            remote_columns = prop.remote_side if prop.direction is ONETOMANY else ()
+            nested_options = get_loader_options(
+                prop.mapper.class_,
+                nested_schema,
+                project=project,
+                depth=depth - 1,
+                extra_columns=remote_columns,
+            )
+            if nested_options:
+                loader = loader.options(*nested_options)
+        options.append(loader)
+    return options
@@ -1,16 +1,26 @@
+import copy
 import logging
 import re
-import six
 
-from collections import OrderedDict
-from inspect import isclass
+from types import MappingProxyType
 
 from chalice.app import BadRequestError
+from marshmallow import Schema
+from marshmallow.fields import Field, List, Nested
+
+from chalice_plus.cache import LRUCache
 
 log = logging.getLogger(__name__)
 
 LEXER = re.compile(r'\{|\}|\,|[\w_:\-\*]+')
 
+MAX_MASK_LENGTH = 1024
+MAX_MASK_DEPTH = 8
+
+
+# Parsed masks keyed by the raw mask string
+mask_cache = LRUCache(maxsize=256)
+
 
 class MaskError(BadRequestError):
     '''Raised when an error occurs on mask'''
@@ -22,24 +32,33 @@ class ParseError(MaskError):
     pass
 
 
-class Mask(OrderedDict):
+class Mask(dict):
     '''
     Hold a parsed mask.
 
+    Masks are immutable once built, so parsed masks can be cached and shared between
+    requests (see :func:`parse_mask`).
+
     :param str|dict|Mask mask: A mask, parsed or not
     :param bool skip: If ``True``, missing fields won't appear in result
     '''
     def __init__(self, mask=None, skip=False, **kwargs):
         self.skip = skip
-        if isinstance(mask, six.string_types):
+        self._string = None
+        if isinstance(mask, str):
             super().__init__()
             self.parse(mask)
-        elif isinstance(mask, (dict, OrderedDict)):
+        elif isinstance(mask, dict):
             super().__init__(mask, **kwargs)
         else:
-            self.skip = skip
             super().__init__(**kwargs)
 
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Mask is immutable")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
     def parse(self, mask):
         '''
         Parse a fields mask.
@@ -54,11 +73,14 @@ class Mask(OrderedDict):
         All extras characters will be ignored.
 
         :param str mask: the mask string to parse
-        :raises ParseError: when a mask is unparseable/invalid
+        :raises ParseError: when a mask is unparseable/invalid, longer than
+            ``MAX_MASK_LENGTH`` or nested deeper than ``MAX_MASK_DEPTH``
 
         '''
         if not mask:
             return
+        if len(mask) > MAX_MASK_LENGTH:
+            raise ParseError('Mask is too long')
 
         mask = self.clean(mask)
         fields = self
@@ -69,9 +91,12 @@ class Mask(OrderedDict):
             if token == '{':
                 if previous not in fields:
                     raise ParseError('Unexpected opening bracket')
-                fields[previous] = Mask(skip=self.skip)
+                if len(stack) >= MAX_MASK_DEPTH:
+                    raise ParseError('Mask is too deeply nested')
+                nested = Mask(skip=self.skip)
+                dict.__setitem__(fields, previous, nested)
                 stack.append(fields)
-                fields = fields[previous]
+                fields = nested
             elif token == '}':
                 if not stack:
                     raise ParseError('Unexpected closing bracket')
@@ -80,7 +105,7 @@ class Mask(OrderedDict):
                 if previous in (',', '{', None):
                     raise ParseError('Unexpected comma')
             else:
-                fields[token] = True
+                dict.__setitem__(fields, token, True)
 
             previous = token
 
@@ -91,7 +116,7 @@ class Mask(OrderedDict):
         '''Remove unnecessary characters'''
         mask = mask.replace('\n', '').strip()
         # External brackets are optional
-        if mask[0] == '{':
+        if mask.startswith('{'):
             if mask[-1] != '}':
                 raise ParseError('Missing closing bracket')
             mask = mask[1:-1]
@@ -101,25 +126,24 @@ class Mask(OrderedDict):
         '''
         Apply a fields mask to the data.
 
-        :param data: The data or model to apply mask on
+        :param data: The data to apply the mask on, or a schema or nested field to
+            mask (see :func:`mask_schema`)
         :raises MaskError: when unable to apply the mask
 
         '''
-        from . import fields
         # Should handle lists
         if isinstance(data, (list, tuple, set)):
             return [self.apply(d) for d in data]
-        elif isinstance(data, (fields.Nested, fields.List, fields.Polymorph)):
-            return data.clone(self)
-        elif type(data) == fields.Raw:
-            return fields.Raw(default=data.default, attribute=data.attribute, mask=self)
-        elif data == fields.Raw:
-            return fields.Raw(mask=self)
-        elif isinstance(data, fields.Raw) or isclass(data) and issubclass(data, fields.Raw):
-            # Not possible to apply a mask on these remaining fields types
-            raise MaskError('Mask is inconsistent with model')
+        elif isinstance(data, Schema):
+            return mask_schema(data, self)
+        elif isinstance(data, Field):
+            masked = mask_field(data, self)
+            if masked is data:
+                # Only nested fields can be masked
+                raise MaskError('Mask is inconsistent with model')
+            return masked
         # Should handle objects
-        elif (not isinstance(data, (dict, OrderedDict)) and hasattr(data, '__dict__')):
+        elif not isinstance(data, dict) and hasattr(data, '__dict__'):
             data = data.__dict__
 
         return self.filter_data(data)
@@ -134,7 +158,7 @@ class Mask(OrderedDict):
 
         '''
         out = {}
-        for field, content in six.iteritems(self):
+        for field, content in self.items():
             if field == '*':
                 continue
             elif isinstance(content, Mask):
@@ -151,16 +175,45 @@ class Mask(OrderedDict):
                 out[field] = data.get(field, None)
 
         if '*' in self.keys():
-            for key, value in six.iteritems(data):
+            for key, value in data.items():
                 if key not in out:
                     out[key] = value
         return out
 
     def __str__(self):
-        return '{{{0}}}'.format(','.join([
-            ''.join((k, str(v))) if isinstance(v, Mask) else k
-            for k, v in six.iteritems(self)
-        ]))
+        if self._string is None:
+            self._string = '{{{0}}}'.format(','.join([
+                ''.join((k, str(v))) if isinstance(v, Mask) else k
+                for k, v in self.items()
+            ]))
+        return self._string
+
+
+def parse_mask(mask):
+    '''
+    Parse a mask string, reusing the parsed mask if the same string was seen before.
+
+    :param str mask: the raw mask, e.g. the value of the ``X-Fields`` header
+    :raises ParseError: when a mask is unparseable/invalid
+    '''
+    return mask_cache.get_or_set(mask, lambda: Mask(mask))
+
+
+def mask_field(field_obj, mask):
+    '''
+    Return a copy of a ``Nested`` (or ``List(Nested)``) field dumping with a masked schema.
+
+    Other fields cannot be masked any further and are returned unchanged.
+    '''
+    if isinstance(field_obj, List) and isinstance(field_obj.inner, Nested):
+        masked = copy.copy(field_obj)
+        masked.inner = mask_field(field_obj.inner, mask)
+        return masked
+    if isinstance(field_obj, Nested):
+        masked = copy.copy(field_obj)
+        masked._schema = mask_schema(field_obj.schema, mask)
+        return masked
+    return field_obj
 
 
 def mask_fields(fields, mask):
@@ -169,14 +222,19 @@ def mask_fields(fields, mask):
         if field_name in fields:
             field_obj = fields[field_name]
             if isinstance(mask_value, Mask):
-                field_obj.schema.dump_fields = mask_fields(
-                    fields[field_name].schema.dump_fields,
-                    mask_value,
-                )
+                field_obj = mask_field(field_obj, mask_value)
             new_fields[field_name] = field_obj
-    return new_fields
+    return MappingProxyType(new_fields)
 
 
 def mask_schema(schema, mask):
-    schema.dump_fields = mask_fields(fields=schema.dump_fields, mask=mask)
-    return schema
+    '''
+    Return a masked view of ``schema``, leaving ``schema`` untouched.
+
+    The view is a shallow copy with its own read-only ``dump_fields``; only the nested
+    fields named in the mask are copied, so building a view is cheap and both the
+    original and the view can be cached and shared between requests.
+    '''
+    masked = copy.copy(schema)
+    masked.dump_fields = mask_fields(fields=schema.dump_fields, mask=mask)
+    return masked
@@ -0,0 +1,169 @@
+import logging
+import os
+
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from chalice_plus.loading import get_nested_schema
+
+log = logging.getLogger(__name__)
+
+MODES = ("warn", "raise")
+# Enables the detector in every view, e.g. set per stage in .chalice/config.json
+MODE_ENVIRONMENT_VARIABLE = "CHALICE_PLUS_N_PLUS_ONE"
+
+current_detector = ContextVar("chalice_plus_current_detector", default=None)
+
+_installed = False
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class LazyLoad:
+    '''The lazy loads of one relationship while serializing with one schema.'''
+    def __init__(self, model, relationship, schema, field, statement):
+        self.model = model
+        self.relationship = relationship
+        self.schema = schema
+        self.field = field
+        self.statement = statement
+        self.count = 0
+
+    def __str__(self):
+        location = f"{self.model.__name__}.{self.relationship}"
+        if self.schema is not None:
+            field = f", field '{self.field}'" if self.field else ""
+            location += f" (serialized by {type(self.schema).__name__}{field})"
+        return f"{location} was lazy loaded {self.count} times:\n    {self.statement}"
+
+
+def find_field(schema, model, relationship, prefix="", visited=None):
+    '''Return the dotted path of the schema field dumping ``model.relationship``.'''
+    visited = set() if visited is None else visited
+    if type(schema) in visited:
+        return None
+    visited.add(type(schema))
+
+    schema_model = getattr(schema.opts, "model", None)
+    for name, field in schema.dump_fields.items():
+        if schema_model is model and (field.attribute or name) == relationship:
+            return prefix + name
+        nested = get_nested_schema(field)
+        if nested is not None:
+            path = find_field(nested, model, relationship, f"{prefix}{name}.", visited)
+            if path:
+                return path
+    return None
+
+
+class NPlusOneDetector:
+    '''
+    Detect relationships lazy loaded over and over while serializing, i.e. N+1 queries.
+
+    Lazy loads are grouped by relationship and schema; relationships loaded at least
+    ``threshold`` times are reported when the detector exits, by logging a warning
+    (``mode="warn"``) or raising ``NPlusOneError`` (``mode="raise"``). Fix them with
+    eager loading, e.g. the views' ``get_query_options``.
+
+    Views use one per request when their ``n_plus_one`` attribute or the
+    ``CHALICE_PLUS_N_PLUS_ONE`` environment variable is set. In tests, use the
+    ``n_plus_one`` fixture from ``chalice_plus.testing`` instead.
+    '''
+    def __init__(self, mode="raise", threshold=2):
+        assert mode in MODES, "Unknown N+1 detection mode '%s'." % mode
+        self.mode = mode
+        self.threshold = threshold
+        self.lazy_loads = {}
+        self.schema = None
+        self._token = None
+
+    def __enter__(self):
+        install()
+        self._token = current_detector.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        current_detector.reset(self._token)
+        if exc_type is None:
+            self.report()
+
+    @contextmanager
+    def serializing(self, schema):
+        previous, self.schema = self.schema, schema
+        try:
+            yield
+        finally:
+            self.schema = previous
+
+    def record(self, relationship, statement):
+        model = relationship.parent.class_
+        key = (model, relationship.key, id(self.schema))
+        lazy_load = self.lazy_loads.get(key)
+        if lazy_load is None:
+            field = find_field(self.schema, model, relationship.key)
+            statement = str(statement).replace("\n", "")
+            lazy_load = LazyLoad(model, relationship.key, self.schema, field, statement)
+            self.lazy_loads[key] = lazy_load
+        lazy_load.count += 1
+
+    def get_problems(self):
+        return [
+            lazy_load for lazy_load in self.lazy_loads.values()
+            if lazy_load.count >= self.threshold
+        ]
+
+    def report(self):
+        problems = self.get_problems()
+        if not problems:
+            return
+        message = "N+1 queries detected:\n" + "\n".join(str(problem) for problem in problems)
+        if self.mode == "raise":
+            raise NPlusOneError(message)
+        log.warning(message)
+
+
+def _on_do_orm_execute(orm_execute_state):
+    detector = current_detector.get()
+    if detector is None or detector.schema is None:
+        return
+    # Only lazy loads have an instance they are loaded from; eager loads (e.g.
+    # selectinload) run once per query
+    if orm_execute_state.is_relationship_load and orm_execute_state.lazy_loaded_from is not None:
+        relationship = orm_execute_state.loader_strategy_path[-1]
+        detector.record(relationship, orm_execute_state.statement)
+
+
+def install():
+    '''Listen to the lazy loads of every session.'''
+    global _installed
+    if not _installed:
+        event.listen(Session, "do_orm_execute", _on_do_orm_execute)
+        _installed = True
+
+
+def get_mode(mode=None):
+    return mode or os.environ.get(MODE_ENVIRONMENT_VARIABLE) or None
+
+
+def detect(mode=None):
+    '''
+    Return a detector for a request, unless detection is disabled or a detector is
+    already active (e.g. the test's).
+    '''
+    mode = get_mode(mode)
+    if mode is None or current_detector.get() is not None:
+        return nullcontext()
+    return NPlusOneDetector(mode)
+
+
+def serializing(schema):
+    '''Attribute the lazy loads run inside the block to ``schema``.'''
+    detector = current_detector.get()
+    if detector is None:
+        return nullcontext()
+    return detector.serializing(schema)
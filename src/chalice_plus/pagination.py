@@ -0,0 +1,389 @@
+import base64
+import binascii
+import json
+
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import urlencode
+from uuid import UUID
+
+from chalice.app import BadRequestError
+from sqlalchemy import and_, inspect, or_, text
+
+
+def get_explain_statement(statement, dialect):
+    '''Return the SQL and parameters of a JSON ``EXPLAIN`` of ``statement``.'''
+    # Expanding parameters (e.g. IN lists) are only rendered when the statement is
+    # executed normally, so they have to be rendered into the SQL here
+    compiled = statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return f"EXPLAIN (FORMAT JSON) {compiled}", params
+
+
+class BasePagination:
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = "page_size"
+    # One of "exact", "estimated", "capped" or None
+    count_strategy = None
+    count_cap = 1000
+    count_header = "X-Total-Count"
+
+    def __init__(self, view):
+        self.view = view
+        self.request = view.request
+        self.count = None
+
+    def get_query_param(self, name):
+        query_params = self.request.query_params or {}
+        return query_params.get(name)
+
+    def get_page_size(self):
+        max_page_size = getattr(self.view, "max_page_size", None) or self.max_page_size
+        page_size = getattr(self.view, "page_size", None) or self.page_size
+
+        raw_page_size = self.get_query_param(self.page_size_query_param)
+        if raw_page_size is not None:
+            page_size = self._parse_positive_int(raw_page_size, self.page_size_query_param)
+            if page_size == 0:
+                raise BadRequestError(f"Invalid {self.page_size_query_param}: {raw_page_size}")
+
+        return min(page_size, max_page_size)
+
+    def get_link(self, **params):
+        query_params = dict(self.request.query_params or {})
+        for key, value in params.items():
+            if value is None:
+                query_params.pop(key, None)
+            else:
+                query_params[key] = value
+        path = self.request.context.get("path", self.request.path)
+        if query_params:
+            return f"{path}?{urlencode(query_params)}"
+        return path
+
+    def paginate_queryset(self, queryset):
+        raise NotImplementedError
+
+    def get_count_strategy(self):
+        return getattr(self.view, "count_strategy", None) or self.count_strategy
+
+    def get_count(self, queryset):
+        '''
+        Count the rows in the (filtered) queryset with the view's ``count_strategy``.
+
+        * ``exact`` - a ``COUNT(*)``, which has to visit every matching row
+        * ``estimated`` - the Postgres planner's estimate, which costs no scan at all.
+          Estimates below ``count_cap`` are replaced by an exact count, as they are
+          cheap to count and the least accurate to estimate. Other databases count
+          exactly.
+        * ``capped`` - counts at most ``count_cap`` rows, returning e.g. ``"1000+"``
+          when there are more
+        '''
+        strategy = self.get_count_strategy()
+        if not strategy or strategy == "none":
+            return None
+        queryset = queryset.order_by(None).enable_eagerloads(False)
+        if strategy == "exact":
+            return queryset.count()
+        if strategy == "capped":
+            return self.get_capped_count(queryset)
+        if strategy == "estimated":
+            estimate = self.get_estimated_count(queryset)
+            if estimate is None or estimate < self.count_cap:
+                return queryset.count()
+            return estimate
+        raise AssertionError(
+            "'%s' uses unknown count_strategy '%s'." % (self.view.__class__.__name__, strategy)
+        )
+
+    def get_capped_count(self, queryset):
+        count = queryset.limit(self.count_cap + 1).count()
+        if count > self.count_cap:
+            return f"{self.count_cap}+"
+        return count
+
+    def get_estimated_count(self, queryset):
+        '''Return the planner's row estimate for the queryset, or ``None`` if unavailable.'''
+        session = queryset.session
+        if session.get_bind().dialect.name != "postgresql":
+            return None
+
+        if queryset.whereclause is None:
+            # An unfiltered table: the row count kept up to date by (auto)vacuum
+            table = inspect(self.view.model).local_table
+            estimate = session.scalar(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+                {"name": table.fullname},
+            )
+            # Tables that have never been analyzed have no statistics (-1)
+            if estimate is not None and estimate >= 0:
+                return estimate
+
+        sql, params = get_explain_statement(queryset.statement, session.get_bind().dialect)
+        plan = session.connection().exec_driver_sql(sql, params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def get_headers(self):
+        if self.count is None:
+            return {}
+        return {self.count_header: str(self.count)}
+
+    def get_required_columns(self):
+        '''Columns that must be selected for the paginator to build its links.'''
+        return []
+
+    def get_next_link(self):
+        raise NotImplementedError
+
+    def get_previous_link(self):
+        raise NotImplementedError
+
+    def get_paginated_response(self, data):
+        response = {
+            "results": data,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+        }
+        if self.count is not None:
+            response["count"] = self.count
+        return response
+
+    def _parse_positive_int(self, value, name):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise BadRequestError(f"Invalid {name}: {value}")
+        if value < 0:
+            raise BadRequestError(f"Invalid {name}: {value}")
+        return value
+
+
+class LimitOffsetPagination(BasePagination):
+    '''
+    Classic limit/offset pagination, e.g. ``/books?limit=20&offset=40``.
+
+    The database still has to walk past ``offset`` rows, so prefer
+    ``CursorPagination`` for large tables. Lists without an ordering are ordered by
+    their primary key, as the rows' order (and so each page) isn't stable otherwise.
+    '''
+    limit_query_param = "limit"
+    offset_query_param = "offset"
+    page_size_query_param = limit_query_param
+
+    def paginate_queryset(self, queryset):
+        self.count = self.get_count(queryset)
+        self.limit = self.get_page_size()
+        raw_offset = self.get_query_param(self.offset_query_param)
+        self.offset = 0
+        if raw_offset is not None:
+            self.offset = self._parse_positive_int(raw_offset, self.offset_query_param)
+        if not queryset._order_by_clauses:
+            queryset = queryset.order_by(*inspect(self.view.model).primary_key)
+
+        # Fetch one extra row to find out whether there is a next page without a COUNT
+        results = queryset.limit(self.limit + 1).offset(self.offset).all()
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.get_link(**{
+            self.limit_query_param: self.limit,
+            self.offset_query_param: self.offset + self.limit,
+        })
+
+    def get_previous_link(self):
+        if self.offset <= 0:
+            return None
+        offset = max(self.offset - self.limit, 0)
+        return self.get_link(**{
+            self.limit_query_param: self.limit,
+            self.offset_query_param: offset or None,
+        })
+
+
+class Cursor:
+    def __init__(self, position, reverse=False):
+        self.position = position
+        self.reverse = reverse
+
+
+class CursorPagination(BasePagination):
+    '''
+    Keyset pagination on an indexed ordering column, e.g. ``/books?cursor=eyJwIjpbMl19``.
+
+    Each page is fetched with a ``WHERE ordering > :last_seen`` clause instead of an
+    ``OFFSET``, so the cost of a page does not grow with its depth in the table.
+
+    ``ordering`` (on the paginator or the view, or asked for by the client through the
+    view's ``ordering_fields``) should name a non-nullable, indexed column on the model.
+    Prefix with ``-`` for descending order. Only the first column of the view's ordering
+    is used. The primary key is used as a tie breaker when it is not unique.
+    '''
+    cursor_query_param = "cursor"
+    ordering = "id"
+
+    def get_ordering(self):
+        # Keyed on the first column the list is ordered by (see ListMixin.get_ordering)
+        ordering = self.view.get_ordering()
+        ordering = ordering[0] if ordering else self.ordering
+        descending = ordering.startswith("-")
+        return ordering.lstrip("-"), descending
+
+    def get_key_columns(self):
+        mapper = inspect(self.view.model)
+        field_name, _ = self.get_ordering()
+        assert field_name in mapper.columns, (
+            "'%s' uses ordering '%s' which is not a column on %s."
+            % (self.view.__class__.__name__, field_name, self.view.model.__name__)
+        )
+        ordering_column = mapper.columns[field_name]
+        pk_column = mapper.primary_key[0]
+        pk_name = mapper.get_property_by_column(pk_column).key
+        columns = [(field_name, ordering_column)]
+        if pk_name != field_name:
+            columns.append((pk_name, pk_column))
+        return columns
+
+    def get_required_columns(self):
+        return [column for _, column in self.get_key_columns()]
+
+    def filter_queryset(self, queryset):
+        '''Order the queryset on the key columns and skip to the cursor position.'''
+        self.cursor = self.decode_cursor()
+        self.key_columns = self.get_key_columns()
+        reverse = self.cursor.reverse if self.cursor else False
+        _, descending = self.get_ordering()
+        # The direction we walk the index in for this page
+        backwards = descending != reverse
+
+        columns = [column for _, column in self.key_columns]
+        queryset = queryset.order_by(None).order_by(
+            *[column.desc() if backwards else column.asc() for column in columns]
+        )
+        if self.cursor:
+            queryset = queryset.filter(self.get_position_clause(columns, backwards))
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        self.count = self.get_count(queryset)
+        self.page_size = self.get_page_size()
+        queryset = self.filter_queryset(queryset)
+        reverse = self.cursor.reverse if self.cursor else False
+
+        results = queryset.limit(self.page_size + 1).all()
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.results = results
+        return results
+
+    def get_position_clause(self, columns, backwards):
+        values = self.cursor.position
+        if len(values) != len(columns):
+            raise BadRequestError("Invalid cursor")
+
+        def compare(column, value):
+            return column < value if backwards else column > value
+
+        clause = compare(columns[-1], values[-1])
+        for column, value in zip(reversed(columns[:-1]), reversed(values[:-1])):
+            clause = or_(compare(column, value), and_(column == value, clause))
+        return clause
+
+    def get_position(self, item):
+        return [getattr(item, name) for name, _ in self.key_columns]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.results:
+            cursor = Cursor(self.get_position(self.results[-1]))
+        elif self.cursor:
+            # An empty page reached by walking backwards, restart from where we were
+            cursor = Cursor(self.cursor.position)
+        else:
+            return None
+        return self.get_link(**{self.cursor_query_param: self.encode_cursor(cursor)})
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.results:
+            cursor = Cursor(self.get_position(self.results[0]), reverse=True)
+        else:
+            cursor = Cursor(self.cursor.position, reverse=True)
+        return self.get_link(**{self.cursor_query_param: self.encode_cursor(cursor)})
+
+    def encode_cursor(self, cursor):
+        data = {"p": [self._encode_value(value) for value in cursor.position]}
+        if cursor.reverse:
+            data["r"] = 1
+        encoded = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(encoded).decode("ascii").rstrip("=")
+
+    def decode_cursor(self):
+        encoded = self.get_query_param(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            position = [
+                self._decode_value(column, value)
+                for (_, column), value in zip(self.get_key_columns(), data["p"])
+            ]
+            return Cursor(position, reverse=bool(data.get("r")))
+        except (
+            binascii.Error, json.decoder.JSONDecodeError, KeyError,
+            TypeError, ValueError, UnicodeError,
+        ):
+            raise BadRequestError("Invalid cursor")
+
+    def _encode_value(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, (UUID, Decimal)):
+            return str(value)
+        return value
+
+    def _decode_value(self, column, value):
+        if value is None:
+            return None
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            return value
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        if python_type in (UUID, Decimal, int, float):
+            return python_type(value)
+        return value
+
+
+class ContinuationCursor(CursorPagination):
+    '''
+    Keyset position used to resume an export that stopped at its size limit.
+
+    Exports only move forwards, so the token is always a forward cursor.
+    '''
+    cursor_query_param = "continuation"
+
+    def get_token(self, item):
+        return self.encode_cursor(Cursor(self.get_position(item)))
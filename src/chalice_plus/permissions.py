@@ -15,6 +15,7 @@ class IsAdmin:
 
 class IsOwner:
     message = "User is not owner"
+    requires_object = True
 
     def has_permission(self, view):
         user = view.authenticator.user
@@ -24,7 +25,63 @@ class IsOwner:
 
 class IsOwnerOrAdmin:
     message = "User is not owner or admin"
+    requires_object = True
 
     def has_permission(self, view):
         user = view.authenticator.user
         return user and (user.is_superuser or user.id == view.object.created_by_id)
+
+
+class IsAuthenticatedClaim:
+    '''Checks the token has a subject, without loading the user.'''
+    message = "User is not authenticated"
+
+    def has_permission(self, view):
+        return bool(view.authenticator.user_id)
+
+
+class IsAdminClaim:
+    '''Checks the token's ``cognito:groups`` claim contains ``admin_group``.'''
+    message = "User is not admin"
+    admin_group = "admin"
+
+    def has_permission(self, view):
+        return self.admin_group in view.authenticator.groups
+
+
+class IsOwnerClaim:
+    '''
+    Checks the view's ``owner_field`` is the token's subject, without loading the user.
+
+    List views are filtered down to the user's rows instead.
+    '''
+    message = "User is not owner"
+
+    def has_permission(self, view):
+        user_id = view.authenticator.user_id
+        if not user_id:
+            return False
+        is_owner = getattr(view, "is_owner", None)
+        return is_owner is None or is_owner(user_id)
+
+    def get_filter_clause(self, view):
+        return view.get_owner_clause(view.authenticator.user_id)
+
+
+class IsOwnerOrAdminClaim:
+    message = "User is not owner or admin"
+    admin_group = "admin"
+
+    def is_admin(self, view):
+        return self.admin_group in view.authenticator.groups
+
+    def has_permission(self, view):
+        user_id = view.authenticator.user_id
+        if not user_id:
+            return False
+        is_owner = getattr(view, "is_owner", None)
+        return self.is_admin(view) or is_owner is None or is_owner(user_id)
+
+    def get_filter_clause(self, view):
+        if not self.is_admin(view):
+            return view.get_owner_clause(view.authenticator.user_id)
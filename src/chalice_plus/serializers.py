@@ -0,0 +1,165 @@
+import json
+import weakref
+
+from chalice import Response
+from chalice.app import handle_extra_types
+from marshmallow import fields
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+from sqlalchemy import inspect
+from sqlalchemy.orm import ColumnProperty
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def isoformat(value):
+    return value.isoformat()
+
+
+def get_converter(field_obj):
+    '''
+    Return how a simple field serializes a column value, or ``False`` if the field
+    has logic of its own and has to be serialized by marshmallow.
+
+    ``None`` means the column value is already JSON ready.
+    '''
+    field_class = type(field_obj)
+    if field_class in (fields.String, fields.Boolean):
+        return None
+    if field_class is fields.Integer and not field_obj.as_string:
+        return None
+    if field_class is fields.Float and not field_obj.as_string:
+        return float
+    if field_class is fields.UUID:
+        return str
+    if field_class in (fields.DateTime, fields.Date) and field_obj.format in (None, "iso"):
+        return isoformat
+    return False
+
+
+class Serializer:
+    '''
+    A dump schema compiled into a flat extraction function.
+
+    When every field of the schema is a simple field backed by a column, rows are
+    selected as plain tuples and never become ORM objects. Otherwise simple fields are
+    read straight off the objects and only the remaining fields (``Nested``,
+    ``Method``...) are serialized by marshmallow.
+    '''
+    def __init__(self, model, schema):
+        self.model = model
+        self.schema = schema
+        self.columns = None
+        self.plan = []
+
+        mapper = inspect(model)
+        use_rows = True
+        for field_name, field_obj in schema.dump_fields.items():
+            key = field_obj.data_key if field_obj.data_key is not None else field_name
+            attribute = field_obj.attribute or field_name
+            prop = mapper.attrs.get(attribute)
+            converter = get_converter(field_obj)
+            if converter is False or not isinstance(prop, ColumnProperty):
+                use_rows = False
+                self.plan.append((key, field_name, field_obj, False))
+            else:
+                self.plan.append((key, attribute, prop, converter))
+
+        if use_rows:
+            self.columns = [getattr(model, prop.key) for _, _, prop, _ in self.plan]
+
+    def prepare_queryset(self, queryset, extra_columns=()):
+        '''Select plain row tuples when the whole schema can be read from columns.'''
+        if self.columns is None:
+            return queryset
+        columns = list(self.columns)
+        selected = {attr.key for attr in columns}
+        mapper = inspect(self.model)
+        for column in extra_columns:
+            key = mapper.get_property_by_column(column).key
+            if key not in selected:
+                columns.append(getattr(self.model, key))
+                selected.add(key)
+        return queryset.with_entities(*columns)
+
+    def dump(self, items):
+        if self.columns is not None:
+            return self.dump_rows(items)
+        return self.dump_objects(items)
+
+    def dump_rows(self, rows):
+        keys = [key for key, _, _, _ in self.plan]
+        if not any(converter for _, _, _, converter in self.plan):
+            return [dict(zip(keys, row)) for row in rows]
+
+        converters = [converter for _, _, _, converter in self.plan]
+        data = []
+        for row in rows:
+            item = {}
+            for key, converter, value in zip(keys, converters, row):
+                if converter is not None and value is not None:
+                    value = converter(value)
+                item[key] = value
+            data.append(item)
+        return data
+
+    def dump_objects(self, objects):
+        schema = self.schema
+        data = []
+        for obj in objects:
+            item = {}
+            for key, attribute, field_obj, converter in self.plan:
+                if converter is False:
+                    value = field_obj.serialize(attribute, obj, accessor=schema.get_attribute)
+                    if value is fields.missing_:
+                        continue
+                else:
+                    value = getattr(obj, attribute)
+                    if converter is not None and value is not None:
+                        value = converter(value)
+                item[key] = value
+            data.append(item)
+        return data
+
+
+class SchemaSerializer:
+    '''Fallback for schemas with dump hooks, which only marshmallow can apply.'''
+    def __init__(self, schema):
+        self.schema = schema
+
+    def prepare_queryset(self, queryset, extra_columns=()):
+        return queryset
+
+    def dump(self, items):
+        return self.schema.dump(items)
+
+
+# Compiled serializers, dropped along with their schema when it leaves the schema cache
+_serializers = weakref.WeakKeyDictionary()
+
+
+def get_serializer(model, schema):
+    '''Return the compiled serializer for a dump schema.'''
+    serializer = _serializers.get(schema)
+    if serializer is None:
+        if schema._hooks[PRE_DUMP] or schema._hooks[POST_DUMP]:
+            serializer = SchemaSerializer(schema)
+        else:
+            serializer = Serializer(model, schema)
+        _serializers[schema] = serializer
+    return serializer
+
+
+def dumps(data):
+    '''Encode data as JSON, using ``orjson`` when it is installed.'''
+    if orjson is not None:
+        return orjson.dumps(data, default=handle_extra_types).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"), default=handle_extra_types)
+
+
+def json_response(data, status_code=200, headers=None):
+    '''Return a response whose body has already been encoded.'''
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    return Response(body=dumps(data), headers=headers, status_code=status_code)
@@ -0,0 +1,17 @@
+'''
+Pytest helpers, enabled with ``pytest_plugins = ["chalice_plus.testing"]`` in a
+``conftest.py``.
+'''
+import pytest
+
+from chalice_plus.instrumentation import assert_max_queries
+from chalice_plus.nplusone import NPlusOneDetector
+
+__all__ = ["assert_max_queries", "n_plus_one"]
+
+
+@pytest.fixture
+def n_plus_one():
+    '''Fail the test if a view lazy loads a relationship over and over while serializing.'''
+    with NPlusOneDetector(mode="raise") as detector:
+        yield detector
@@ -1,10 +1,30 @@
-from functools import cache, cached_property
+import hashlib
+import json
+
+from contextlib import nullcontext
+from functools import cached_property
 from chalice import Response
-from chalice.app import BadRequestError, ForbiddenError, MethodNotAllowedError, NotFoundError
+from chalice.app import (
+    BadRequestError, ChaliceViewError, ForbiddenError, MethodNotAllowedError, NotFoundError
+)
 from marshmallow.exceptions import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, exists, false, inspect, literal_column, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import MANYTOONE, Session
+from chalice_plus.cache import LRUCache, get_model_name, invalidate
+from chalice_plus.conditional import get_validator_headers, is_not_modified, make_etag
+from chalice_plus.db import get_engine
 from chalice_plus.exceptions import InvalidRouteParameter
-from chalice_plus.masking import Mask, mask_schema
+from chalice_plus.filters import FieldFilter, OrderingFilter, SearchFilter
+from chalice_plus.instrumentation import RequestMetrics, current_metrics, instrument_engine
+from chalice_plus.loading import get_loader_options
+from chalice_plus.masking import mask_schema, parse_mask
+from chalice_plus.nplusone import detect, serializing
+from chalice_plus.pagination import ContinuationCursor
+from chalice_plus.serializers import dumps, get_serializer, json_response
+
+# Built dump schemas keyed by (schema class, many, mask), shared across requests
+schema_cache = LRUCache(maxsize=256)
 
 
 class APIView:
@@ -13,6 +33,21 @@ class APIView:
     authenticator_class = None
     permission_classes = {}
     mask_header = "x-fields"
+    eager_load_depth = 3
+    owner_field = "created_by_id"
+    # Add ETags to GET responses and answer matching If-None-Match requests with a 304
+    use_etags = False
+    # A CachePolicy to cache GET responses with
+    cache_policy = None
+    # Record timings and query counts: sent in a Server-Timing header when the app is in
+    # debug mode, logged as CloudWatch metrics otherwise
+    instrument = False
+    metrics_namespace = "ChalicePlus"
+    # Report relationships lazy loaded over and over while serializing: "warn" or "raise"
+    # (defaults to the CHALICE_PLUS_N_PLUS_ONE environment variable)
+    n_plus_one = None
+    # The permissions checked for the current request
+    permissions = ()
 
     @classmethod
     def as_view(cls, name=""):
@@ -23,38 +58,133 @@ class APIView:
         view.permission_classes = cls.permission_classes
         return view
 
-    @cache
-    def get_schema(self, many=False):
+    def get_schema_class(self):
         assert self.schema_class is not None, (
             "'%s' should either include a `schema_class` attribute, "
             "or override the `get_schema_class()` method."
             % self.__class__.__name__
         )
-        return self.schema_class(many=many)
+        return self.schema_class
+
+    def get_schema(self, many=False):
+        schema_class = self.get_schema_class()
+        return schema_cache.get_or_set(
+            (schema_class, many, None),
+            lambda: schema_class(many=many),
+        )
 
-    @cache
     def get_load_schema(self, many=False):
-        return self.get_schema(many=many)
+        # Not cached: load() keeps the request's session and instance on the schema
+        return self.get_schema_class()(many=many)
 
-    @cache
     def get_dump_schema(self, many=False):
-        schema = self.get_schema(many=many)
-        if self.mask:
-            schema = mask_schema(schema, self.mask)
-        return schema
+        if not self.mask:
+            return self.get_schema(many=many)
+        return schema_cache.get_or_set(
+            (self.get_schema_class(), many, str(self.mask)),
+            lambda: mask_schema(self.get_schema(many=many), self.mask),
+        )
+
+    def get_query_options(self, many=False):
+        # Writes expire loaded objects on commit, so only reads benefit from eager loading
+        if self.request.method != "GET":
+            return []
+        schema = self.get_dump_schema(many=many)
+        return get_loader_options(
+            self.model,
+            schema,
+            project=bool(self.mask),
+            depth=self.eager_load_depth,
+        )
 
     def dispatch(self, view, *args, **kwargs):
+        self.app = view.app
         self.request = view.app.current_request
-        with Session(view.app.engine) as session:
-            self.session = session
 
-            method = self.request.method.lower()
-            if method in self.allowed_methods:
-                self.clean_url_parameters(view, **kwargs)
+        method = self.request.method.lower()
+        if method not in self.allowed_methods:
+            raise MethodNotAllowedError(f"Unsupported method: {method}")
+
+        self.metrics = None
+        if self.instrument:
+            self.metrics = RequestMetrics(self.__class__.__name__)
+            metrics_token = current_metrics.set(self.metrics)
+        status_code = 500
+        try:
+            self.clean_url_parameters(view, **kwargs)
+            with self.measure("auth"):
                 self.check_permissions(method)
-                return getattr(self, method)(self.request, *args, **kwargs)
+            with detect(self.n_plus_one):
+                response = self.handle(method, *args, **kwargs)
+            if self.metrics is not None:
+                response = self.add_server_timing(response)
+            status_code = getattr(response, "status_code", 200)
+            return response
+        except ChaliceViewError as e:
+            status_code = e.STATUS_CODE
+            raise
+        finally:
+            self.close_session()
+            if self.metrics is not None:
+                current_metrics.reset(metrics_token)
+                self.report_metrics(status_code)
+
+    def handle(self, method, *args, **kwargs):
+        handler = getattr(self, method)
+        if method == "get" and self.cache_policy is not None:
+            return self.cached_get(handler, *args, **kwargs)
+        response = handler(self.request, *args, **kwargs)
+        if method != "get":
+            self.invalidate_cache(response)
+        return response
+
+    def measure(self, phase):
+        '''Time a phase of the request, when it is instrumented.'''
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.phase(phase)
+
+    def add_server_timing(self, response):
+        if not self.app.debug:
+            return response
+        if not isinstance(response, Response):
+            response = json_response(response)
+        response.headers = {
+            **(response.headers or {}), "Server-Timing": self.metrics.get_server_timing()
+        }
+        return response
+
+    def report_metrics(self, status_code):
+        if self.app.debug:
+            return
+        self.metrics.log_emf(
+            self.metrics_namespace,
+            properties={
+                "Method": self.request.method,
+                "Path": self.request.path,
+                "StatusCode": status_code,
+            },
+        )
+
+    def dump(self, schema, data):
+        with self.measure("serialize"), serializing(schema):
+            return schema.dump(data)
+
+    def commit(self):
+        with self.measure("commit"):
+            self.session.commit()
+
+    @cached_property
+    def session(self):
+        # Created on first use, so requests that never reach the database don't need one
+        engine = get_engine(self.app)
+        if self.instrument:
+            instrument_engine(engine)
+        return Session(engine)
 
-        raise MethodNotAllowedError(f"Unsupported method: {method}")
+    def close_session(self):
+        if "session" in self.__dict__:
+            self.session.close()
 
     def clean_url_parameters(self, view, **kwargs):
         for parameter, converter in view.parameter_converters.items():
@@ -65,18 +195,44 @@ class APIView:
 
         self.kwargs = kwargs
 
+    def get_permissions(self, method):
+        return [permission_class() for permission_class in self.permission_classes.get(method, [])]
+
     def check_permissions(self, method):
         if self.authenticator_class:
-            permission_classes = self.permission_classes.get(method, [])
-            for permission_class in permission_classes:
-                permission = permission_class()
+            self.permissions = self.get_permissions(method)
+            for permission in self.permissions:
                 if not permission.has_permission(self):
                     raise ForbiddenError(getattr(permission, 'message'))
 
+    def get_permission_clauses(self):
+        '''
+        Return the ``WHERE`` clauses permissions restrict querysets with.
+
+        Permissions can define ``get_filter_clause(view)``, returning a clause limiting
+        the rows the user can see, or ``None`` when they can see every row.
+        '''
+        clauses = []
+        for permission in self.permissions:
+            get_filter_clause = getattr(permission, "get_filter_clause", None)
+            if get_filter_clause is not None:
+                clause = get_filter_clause(self)
+                if clause is not None:
+                    clauses.append(clause)
+        return clauses
+
+    def get_owner_clause(self, user_id):
+        '''Return a clause matching the rows whose ``owner_field`` is ``user_id``.'''
+        owner_column = getattr(self.model, self.owner_field)
+        try:
+            return owner_column == coerce_to_column(owner_column, user_id)
+        except (TypeError, ValueError):
+            return false()
+
     @cached_property
     def authenticator(self):
         if self.authenticator_class:
-            return self.authenticator_class(self.request, self.session)
+            return self.authenticator_class(self.request, lambda: self.session)
 
     @cached_property
     def mask(self):
@@ -85,15 +241,93 @@ class APIView:
     def get_mask(self):
         mask_string = self.request.headers.get(self.mask_header)
         if mask_string:
-            return Mask(mask_string)
+            return parse_mask(mask_string)
+
+    def get_cache_key(self):
+        '''Return the key of the current request's response in the cache policy's backend.'''
+        policy = self.cache_policy
+        query_params = self.request.query_params or {}
+        vary_on = policy.vary_on
+        # Permissions filtering the rows by user (e.g. IsOwnerClaim) make every user's
+        # responses different
+        if self.get_permission_clauses():
+            vary_on = (*vary_on, *(item for item in ("user", "groups") if item not in vary_on))
+        vary = []
+        for item in vary_on:
+            if item == "user":
+                vary.append(self.authenticator.user_id if self.authenticator else None)
+            elif item == "groups":
+                vary.append(sorted(self.authenticator.groups) if self.authenticator else [])
+            else:
+                vary.append(item(self))
+        generations = [
+            policy.backend.get_generation(get_model_name(model))
+            for model in (self.model, *policy.depends_on)
+        ]
+        key = json.dumps([
+            self.request.path,
+            sorted((self.request.uri_params or {}).items()),
+            sorted((name, query_params.getlist(name)) for name in query_params),
+            str(self.mask or ""),
+            vary,
+            generations,
+        ], default=str)
+        return "response:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def cached_get(self, handler, *args, **kwargs):
+        '''Serve a GET request from the cache, or cache its response.'''
+        backend = self.cache_policy.backend
+        key = self.get_cache_key()
+        cached = backend.get(key)
+        if cached is not None:
+            headers = cached["headers"]
+            if is_not_modified(self.request.headers, etag=headers.get("ETag")):
+                return Response(body="", headers=headers, status_code=304)
+            return Response(body=cached["body"], headers=headers)
+
+        response = handler(self.request, *args, **kwargs)
+        if not isinstance(response, Response):
+            response = json_response(response)
+        elif not isinstance(response.body, str):
+            response.body = dumps(response.body)
+            response.headers = {"Content-Type": "application/json", **(response.headers or {})}
+        if response.status_code == 200:
+            backend.set(
+                key,
+                {"body": response.body, "headers": dict(response.headers or {})},
+                ttl=self.cache_policy.ttl,
+            )
+        return response
+
+    def invalidate_cache(self, response):
+        '''Invalidate the cached responses of the view's model after a successful write.'''
+        model = getattr(self, "model", None)
+        if model is None:
+            return
+        if isinstance(response, Response) and response.status_code >= 400:
+            return
+        invalidate(model)
+
+    def etag_response(self, data, headers=None):
+        '''
+        Encode ``data`` with a strong ETag hashed from the body, or respond with a 304
+        when the client already has it.
+        '''
+        body = dumps(data)
+        headers = {**(headers or {}), "ETag": make_etag(body)}
+        if is_not_modified(self.request.headers, etag=headers["ETag"]):
+            return Response(body="", headers=headers, status_code=304)
+        return Response(body=body, headers={"Content-Type": "application/json", **headers})
 
 
 class SingleObjectMixin:
     pk_url_kwarg = 'id'
+    # Write PATCH and DELETE requests with a single UPDATE/DELETE ... RETURNING
+    direct_writes = False
 
     def get_object(self):
         if self.pk:
-            return self.session.get(self.model, self.pk)
+            return self.session.get(self.model, self.pk, options=self.get_query_options())
 
     @cached_property
     def pk(self):
@@ -101,28 +335,283 @@ class SingleObjectMixin:
 
     @cached_property
     def object(self):
-        return self.get_object()
+        with self.measure("load"):
+            return self.get_object()
 
     def check_object_exists(self):
         if not self.object:
-            raise NotFoundError(f"Object with {self.pk_url_kwarg} of {self.pk} not found.")
+            self.raise_not_found()
+
+    def is_owner(self, user_id):
+        '''
+        Check the object's ``owner_field`` is ``user_id``.
+
+        Uses the object if it has already been loaded, otherwise a single
+        ``SELECT EXISTS(...)`` query which doesn't load it. Direct writes skip the query
+        and only write the row if it is owned, so non owners get a 404 instead.
+        '''
+        if not self.pk or user_id is None:
+            return False
+        if self.use_direct_write():
+            # Checked by the write itself, which won't match the row if it isn't owned
+            self.deferred_clauses.append(self.get_owner_clause(user_id))
+            return True
+        if "object" in self.__dict__:
+            owner_id = getattr(self.object, self.owner_field, None)
+            return owner_id is not None and str(owner_id) == str(user_id)
+
+        pk_column = inspect(self.model).primary_key[0]
+        query = select(exists().where(pk_column == self.pk, self.get_owner_clause(user_id)))
+        return self.session.scalar(query)
+
+    @cached_property
+    def deferred_clauses(self):
+        '''Conditions the object has to meet, checked when it is written.'''
+        return []
+
+    def use_direct_write(self):
+        '''
+        Whether to write without loading the object first.
+
+        Only possible when no permission needs the loaded object (``requires_object``)
+        and the database supports ``RETURNING``.
+        '''
+        if not self.direct_writes or self.request.method not in ("PATCH", "DELETE"):
+            return False
+        if any(getattr(permission, "requires_object", False) for permission in self.permissions):
+            return False
+        dialect = self.session.get_bind().dialect
+        return dialect.update_returning and dialect.delete_returning
+
+    def get_write_clauses(self):
+        pk_column = inspect(self.model).primary_key[0]
+        return [pk_column == self.pk, *self.get_permission_clauses(), *self.deferred_clauses]
+
+    def check_write_clauses(self):
+        '''
+        Raise a 404 unless the object meets the conditions deferred to the write, for
+        direct writes which end up loading the object instead.
+        '''
+        if not self.deferred_clauses:
+            return
+        if not self.session.scalar(select(exists().where(*self.get_write_clauses()))):
+            self.raise_not_found()
+
+    def raise_not_found(self):
+        raise NotFoundError(f"Object with {self.pk_url_kwarg} of {self.pk} not found.")
+
+
+def coerce_to_column(column, value):
+    '''Convert a token claim (always a string) to the python type of a column.'''
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if isinstance(value, python_type):
+        return value
+    return python_type(value)
 
 
 class RetrieveMixin:
+    # Columns changing whenever the object does, used for ETag / Last-Modified headers
+    version_field = None
+    last_modified_field = None
+
     def get(self, request, *args, **kwargs):
+        if self.version_field or self.last_modified_field:
+            return self.get_versioned()
         self.check_object_exists()
         schema = self.get_dump_schema()
-        return schema.dump(self.object)
+        data = self.dump(schema, self.object)
+        if self.use_etags:
+            return self.etag_response(data)
+        return data
+
+    def get_versioned(self):
+        '''
+        Respond using the object's version columns as validators.
+
+        Conditional requests first select just those columns, so a 304 costs neither
+        loading nor serializing the object.
+        '''
+        headers = self.request.headers
+        if "object" not in self.__dict__ and (
+            "if-none-match" in headers or "if-modified-since" in headers
+        ):
+            validators = self.get_validators()
+            if validators is None:
+                self.raise_not_found()
+            if is_not_modified(headers, *validators):
+                return Response(
+                    body="", headers=get_validator_headers(*validators), status_code=304
+                )
+
+        self.check_object_exists()
+        schema = self.get_dump_schema()
+        return Response(
+            body=self.dump(schema, self.object),
+            headers=get_validator_headers(*self.get_validators(self.object)),
+        )
+
+    def get_validators(self, obj=None):
+        '''
+        Return the ETag and last modified date of the object, read from ``obj`` or
+        selected from the database. Returns ``None`` if the object doesn't exist.
+        '''
+        field_names = list(dict.fromkeys(
+            name for name in (self.version_field, self.last_modified_field) if name
+        ))
+        if obj is None:
+            pk_column = inspect(self.model).primary_key[0]
+            columns = [getattr(self.model, name) for name in field_names]
+            row = self.session.execute(select(*columns).where(pk_column == self.pk)).first()
+            if row is None:
+                return None
+            values = dict(zip(field_names, row))
+        else:
+            values = {name: getattr(obj, name) for name in field_names}
+
+        version = values[self.version_field or self.last_modified_field]
+        # Each field mask is a different representation of the same version
+        etag = make_etag(f"{version}:{self.mask or ''}", weak=True)
+        last_modified = values[self.last_modified_field] if self.last_modified_field else None
+        return etag, last_modified
 
 
 class ListMixin:
+    pagination_class = None
+    page_size = None
+    max_page_size = None
+    count_strategy = None
+    fast_serialization = False
+    filter_backends = (FieldFilter, SearchFilter, OrderingFilter)
+    filter_fields = ()
+    search_fields = ()
+    ordering_fields = ()
+    ordering = None
+
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
         schema = self.get_dump_schema(many=True)
-        return schema.dump(queryset.all())
+        if self.fast_serialization:
+            serializer = get_serializer(self.model, schema)
+            queryset = serializer.prepare_queryset(queryset, self.get_required_columns())
+            data = self.dump_list(queryset, serializer.dump)
+        else:
+            data = self.dump_list(queryset, schema.dump)
+
+        headers = self.get_list_headers()
+        if self.use_etags:
+            return self.etag_response(data, headers)
+        if self.fast_serialization:
+            return json_response(data, headers=headers)
+        if headers:
+            return Response(body=data, headers=headers)
+        return data
+
+    def dump_list(self, queryset, dump):
+        with self.measure("load"):
+            if self.paginator is None:
+                items = queryset.all()
+            else:
+                items = self.paginator.paginate_queryset(queryset)
+        with self.measure("serialize"), serializing(self.get_dump_schema(many=True)):
+            if self.paginator is None:
+                return dump(items)
+            return self.paginator.get_paginated_response(dump(items))
+
+    def get_list_headers(self):
+        if self.paginator is None:
+            return {}
+        return self.paginator.get_headers()
+
+    def get_required_columns(self):
+        if self.paginator is None:
+            return []
+        return self.paginator.get_required_columns()
 
     def get_queryset(self):
-        return self.session.query(self.model)
+        queryset = self.session.query(self.model).options(*self.get_query_options(many=True))
+        clauses = self.get_permission_clauses()
+        if clauses:
+            queryset = queryset.filter(*clauses)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        for backend_class in self.filter_backends:
+            queryset = backend_class(self).filter_queryset(queryset)
+        return queryset
+
+    def get_ordering(self):
+        '''Return the list's ordering, as column names prefixed with ``-`` if descending.'''
+        for backend_class in self.filter_backends:
+            if issubclass(backend_class, OrderingFilter):
+                return backend_class(self).get_ordering()
+        if isinstance(self.ordering, str):
+            return [self.ordering]
+        return list(self.ordering or [])
+
+    @cached_property
+    def paginator(self):
+        if self.pagination_class:
+            return self.pagination_class(self)
+
+
+class ExportMixin(ListMixin):
+    '''
+    Dump a large queryset in one response, for bulk exports.
+
+    Rows are streamed from the database in batches of ``export_batch_size`` and
+    encoded one at a time, so neither the ORM objects nor their dumped dicts are held
+    for the whole result. Once the encoded body would exceed ``export_max_bytes``
+    the export stops and a continuation token is returned in the
+    ``X-Continuation-Token`` header; pass it back as ``?continuation=`` to resume.
+    '''
+    export_format = "json"
+    export_max_bytes = 5 * 1024 * 1024
+    export_batch_size = 1000
+    continuation_header = "X-Continuation-Token"
+
+    def get(self, request, *args, **kwargs):
+        schema = self.get_dump_schema(many=True)
+        serializer = get_serializer(self.model, schema)
+        continuation = ContinuationCursor(self)
+        queryset = serializer.prepare_queryset(
+            self.filter_queryset(self.get_queryset()), continuation.get_required_columns()
+        )
+        queryset = continuation.filter_queryset(queryset).yield_per(self.export_batch_size)
+
+        chunks = []
+        # Leave room for the brackets and one separator or newline per row
+        size = 2
+        last_item = None
+        headers = {"Content-Type": "application/json"}
+        for item, data in self.iter_export(queryset, serializer):
+            chunk = dumps(data)
+            chunk_size = 1 + (len(chunk) if chunk.isascii() else len(chunk.encode("utf-8")))
+            if chunks and size + chunk_size > self.export_max_bytes:
+                headers[self.continuation_header] = continuation.get_token(last_item)
+                break
+            chunks.append(chunk)
+            size += chunk_size
+            last_item = item
+
+        if self.export_format == "ndjson":
+            headers["Content-Type"] = "application/x-ndjson"
+            body = "".join(f"{chunk}\n" for chunk in chunks)
+        else:
+            body = f"[{','.join(chunks)}]"
+        return Response(body=body, headers=headers)
+
+    def iter_export(self, queryset, serializer):
+        batch = []
+        for item in queryset:
+            batch.append(item)
+            if len(batch) == self.export_batch_size:
+                yield from zip(batch, serializer.dump(batch))
+                batch = []
+        if batch:
+            yield from zip(batch, serializer.dump(batch))
 
 
 class CreateMixin:
@@ -132,74 +621,467 @@ class CreateMixin:
     def load_object(self, instance=None, partial=True):
         schema = self.get_load_schema()
         try:
-            return schema.load(
-                self.get_request_data(),
-                session=self.session,
-                instance=instance,
-                partial=partial,
-            )
+            with self.measure("deserialize"):
+                return schema.load(
+                    self.get_request_data(),
+                    session=self.session,
+                    instance=instance,
+                    partial=partial,
+                )
         except ValidationError as e:
             raise BadRequestError(e.messages)
 
     def create_object(self):
         instance = self.load_object(partial=False)
         self.session.add(instance)
-        self.session.commit()
+        self.commit()
         return instance
 
     def post(self, request, *args, **kwargs):
         instance = self.create_object()
         schema = self.get_dump_schema()
-        return Response(body=schema.dump(instance), status_code=201)
+        return Response(body=self.dump(schema, instance), status_code=201)
+
+
+def get_onupdate_value(column):
+    '''Return the value of a column's ``onupdate``, as the ORM would set it on update.'''
+    default = column.onupdate
+    if default.is_callable:
+        return default.arg(None)
+    return default.arg
+
+
+def get_postgresql_upsert(model, values, update_columns):
+    '''
+    Return an ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING`` of ``values``, which
+    replaces the ``update_columns`` of an existing row.
+
+    The ``onupdate`` of the columns not in ``values`` (e.g. an updated date) have to be
+    set explicitly, as SQLAlchemy doesn't apply them to ``ON CONFLICT`` updates.
+    '''
+    # Imported here as it is slow to import, and already loaded by the engine's dialect
+    from sqlalchemy.dialects import postgresql
+
+    mapper = inspect(model)
+    pk_column = mapper.primary_key[0]
+    statement = postgresql.insert(model).values(values)
+    excluded = statement.excluded
+    set_ = {prop.columns[0].name: excluded[prop.columns[0].name] for prop in update_columns}
+    for prop in mapper.column_attrs:
+        column = prop.columns[0]
+        if prop.key not in values and column.onupdate is not None:
+            set_[column.name] = get_onupdate_value(column)
+    statement = statement.on_conflict_do_update(index_elements=[pk_column], set_=set_)
+    # xmax is only 0 for rows inserted (rather than updated) by this transaction
+    return statement.returning(model, literal_column("xmax = 0"))
 
 
 class UpdateMixin:
+    # Make PUT a single INSERT ... ON CONFLICT DO UPDATE (Postgres and SQLite)
+    upsert = False
+
     def get_request_data(self):
         data = self.request.json_body or {}
-        if not self.object:
+        if self.use_upsert() or (not self.use_direct_write() and not self.object):
             data["id"] = self.pk
         return data
 
-    def load_object(self, instance=None, partial=True):
+    def load_object(self, instance=None, partial=True, transient=False):
         schema = self.get_load_schema()
         try:
-            return schema.load(
-                self.get_request_data(),
-                session=self.session,
-                instance=instance,
-                partial=partial,
-            )
+            with self.measure("deserialize"):
+                return schema.load(
+                    self.get_request_data(),
+                    session=self.session,
+                    instance=instance,
+                    partial=partial,
+                    transient=transient,
+                )
         except ValidationError as e:
             raise BadRequestError(e.messages)
 
     def update_object(self, partial=True):
         instance = self.load_object(instance=self.object, partial=partial)
         self.session.add(instance)
-        self.session.commit()
+        self.commit()
+        return instance
+
+    def use_upsert(self):
+        if not self.upsert or self.request.method != "PUT":
+            return False
+        dialect = self.session.get_bind().dialect
+        return dialect.name in ("postgresql", "sqlite") and dialect.insert_returning
+
+    def get_column_values(self, instance):
+        '''
+        Return the column values set on a transient ``instance``, by attribute, including
+        the foreign keys of the many-to-one relationships assigned to it (e.g.
+        ``created_by``).
+
+        Returns ``None`` when relationships which can't be written as column values
+        are assigned, e.g. collections or objects that haven't been saved yet.
+        '''
+        mapper = inspect(self.model)
+        state = inspect(instance)
+        values = {
+            prop.key: state.dict[prop.key] for prop in mapper.column_attrs if prop.key in state.dict
+        }
+        for prop in mapper.relationships:
+            if prop.key not in state.dict:
+                continue
+            if prop.direction is not MANYTOONE:
+                return None
+            related = state.dict[prop.key]
+            for local, remote in prop.local_remote_pairs:
+                key = mapper.get_property_by_column(local).key
+                if related is None:
+                    values[key] = None
+                    continue
+                remote_key = inspect(related).mapper.get_property_by_column(remote).key
+                values[key] = getattr(related, remote_key)
+                if values[key] is None:
+                    return None
+            # Removes the instance from the backref's collection (e.g. User.books), which
+            # would have the session try to add it
+            setattr(instance, prop.key, None)
+        return values
+
+    def upsert_object(self):
+        '''
+        Insert or replace the object without loading it first, returning the saved
+        object and whether it was created, or ``None`` when ``load_object`` assigned
+        relationships that can't be written this way.
+
+        Postgres does it in one ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``,
+        telling inserts from updates by the row's ``xmax``. SQLite runs an
+        ``INSERT ... ON CONFLICT DO NOTHING RETURNING``, followed by an
+        ``UPDATE ... RETURNING`` when the row already existed, and starts over if the
+        row was deleted in between.
+
+        Both databases check ``NOT NULL`` constraints on the inserted row before
+        resolving the conflict, so the data has to include every required column even
+        when the object exists. Constraint violations are reported as a 400.
+        '''
+        values = self.get_column_values(self.load_object(partial=False, transient=True))
+        if values is None:
+            return None
+        mapper = inspect(self.model)
+        pk_column = mapper.primary_key[0]
+        update_columns = [
+            prop for prop in mapper.column_attrs
+            if prop.key in values and prop.columns[0] is not pk_column
+        ]
+        try:
+            return self.execute_upsert(values, update_columns)
+        except IntegrityError:
+            self.session.rollback()
+            raise BadRequestError("Incomplete or conflicts with the existing data.")
+
+    def execute_upsert(self, values, update_columns, attempts=3):
+        pk_column = inspect(self.model).primary_key[0]
+        options = {"populate_existing": True}
+
+        if self.session.get_bind().dialect.name == "postgresql":
+            statement = get_postgresql_upsert(self.model, values, update_columns)
+            return tuple(self.session.execute(statement, execution_options=options).one())
+
+        # Imported here as it is slow to import, and already loaded by the engine's dialect
+        from sqlalchemy.dialects import sqlite
+
+        insert_statement = sqlite.insert(self.model).values(values)
+        insert_statement = insert_statement.on_conflict_do_nothing(index_elements=[pk_column])
+        update_values = {prop.key: values[prop.key] for prop in update_columns}
+        update_statement = update(self.model).where(pk_column == self.pk).values(update_values)
+        for _ in range(attempts):
+            instance = self.session.scalars(
+                insert_statement.returning(self.model), execution_options=options
+            ).one_or_none()
+            if instance is not None:
+                return instance, True
+            # The row was deleted since the insert when nothing is updated either
+            instance = self.session.scalars(
+                update_statement.returning(self.model), execution_options=options
+            ).one_or_none()
+            if instance is not None:
+                return instance, False
+        self.raise_not_found()
+
+    def update_object_directly(self):
+        '''
+        Update the object with a single ``UPDATE ... WHERE pk = :pk RETURNING``, returning
+        the updated object, or ``None`` when there was nothing to update or it has to be
+        loaded to be updated (see ``get_column_values``).
+        '''
+        values = self.get_column_values(self.load_object(partial=True, transient=True))
+        if values is None:
+            return None
+        mapper = inspect(self.model)
+        values.pop(mapper.get_property_by_column(mapper.primary_key[0]).key, None)
+        if not values:
+            return None
+        statement = update(self.model).where(*self.get_write_clauses()).values(values)
+        instance = self.session.scalars(
+            statement.returning(self.model), execution_options={"populate_existing": True}
+        ).one_or_none()
+        if instance is None:
+            self.raise_not_found()
         return instance
 
     def patch(self, request, *args, **kwargs):
+        if self.use_direct_write():
+            instance = self.update_object_directly()
+            if instance is not None:
+                # Dumped before committing, as the commit would expire the returned row
+                data = self.dump(self.get_dump_schema(), instance)
+                self.commit()
+                return data
+            # Nothing to update directly (e.g. an empty body), or relationships assigned
+            # which need the loaded object
+            self.check_write_clauses()
+
         self.check_object_exists()
         instance = self.update_object(partial=True)
         schema = self.get_dump_schema()
-        return schema.dump(instance)
+        return self.dump(schema, instance)
 
     def put(self, request, *args, **kwargs):
+        upserted = self.upsert_object() if self.use_upsert() else None
+        if upserted is not None:
+            instance, created = upserted
+            schema = self.get_dump_schema()
+            # Dumped before committing, as the commit would expire the returned row
+            data = self.dump(schema, instance)
+            self.commit()
+            return Response(body=data, status_code=201 if created else 200)
+
         instance = self.update_object(partial=False)
         schema = self.get_dump_schema()
         if self.object:
-            return schema.dump(instance)
-        return Response(body=schema.dump(instance), status_code=201)
+            return self.dump(schema, instance)
+        return Response(body=self.dump(schema, instance), status_code=201)
 
 
 class DeleteMixin:
+    def delete_object_directly(self):
+        '''Delete the object with a single ``DELETE ... WHERE pk = :pk RETURNING pk``.'''
+        pk_column = inspect(self.model).primary_key[0]
+        statement = delete(self.model).where(*self.get_write_clauses()).returning(pk_column)
+        if self.session.scalars(statement).one_or_none() is None:
+            self.raise_not_found()
+
     def delete(self, request, *args, **kwargs):
+        if self.use_direct_write():
+            self.delete_object_directly()
+            self.commit()
+            return Response(body="", status_code=204)
+
         self.check_object_exists()
         self.session.delete(self.object)
-        self.session.commit()
+        self.commit()
         return Response(body="", status_code=204)
 
 
+class BulkMixin:
+    '''
+    Shared behaviour of the bulk endpoints, which take a JSON array of items.
+
+    Items are loaded with ``schema.load(many=True)`` and written ``bulk_batch_size``
+    at a time, each batch flushed in one round of statements, all in one transaction.
+
+    When ``bulk_atomic`` is set, any invalid item rolls back the whole request and
+    responds with a 400 listing the ``errors`` by item index. Otherwise the valid items
+    are saved (a batch failing in the database is retried item by item to find the
+    culprits) and the response is a 207 with both the results and the errors.
+    '''
+    bulk_batch_size = 500
+    bulk_max_items = 10000
+    bulk_atomic = True
+
+    def get_bulk_data(self):
+        data = self.request.json_body
+        if not isinstance(data, list):
+            raise BadRequestError("Expected a list of items")
+        if len(data) > self.bulk_max_items:
+            raise BadRequestError(f"Too many items, the maximum is {self.bulk_max_items}")
+        return data
+
+    def load_objects(self, entries, partial):
+        '''
+        Load ``(index, data)`` entries, returning ``(index, instance)`` pairs for the
+        valid items and the errors of the others by index.
+        '''
+        schema = self.get_load_schema(many=True)
+        try:
+            instances = schema.load(
+                [data for _, data in entries], many=True, session=self.session, partial=partial
+            )
+            return list(zip([index for index, _ in entries], instances)), {}
+        except ValidationError as e:
+            errors = {entries[position][0]: messages for position, messages in e.messages.items()}
+        valid = [(index, data) for index, data in entries if index not in errors]
+        if not valid:
+            return [], errors
+        instances = schema.load(
+            [data for _, data in valid], many=True, session=self.session, partial=partial
+        )
+        return list(zip([index for index, _ in valid], instances)), errors
+
+    def get_database_error(self, error):
+        if isinstance(error, IntegrityError):
+            return {"_schema": ["Conflicts with the existing data."]}
+        return {"_schema": ["Could not be saved."]}
+
+    def write_bulk(self, write, status_code=200):
+        '''
+        Call ``write(entries)`` for every batch of ``(index, data)`` entries and respond.
+
+        ``write`` performs and flushes the batch's writes, returning the results of the
+        successful items by index and the errors of the others.
+        '''
+        entries = list(enumerate(self.get_bulk_data()))
+        results = {}
+        errors = {}
+        for start in range(0, len(entries), self.bulk_batch_size):
+            batch = entries[start:start + self.bulk_batch_size]
+            try:
+                with self.session.begin_nested():
+                    batch_results, batch_errors = write(batch)
+            except SQLAlchemyError:
+                # Find out which items failed by writing them one at a time
+                batch_results, batch_errors = {}, {}
+                for entry in batch:
+                    try:
+                        with self.session.begin_nested():
+                            item_results, item_errors = write([entry])
+                    except SQLAlchemyError as e:
+                        item_results, item_errors = {}, {entry[0]: self.get_database_error(e)}
+                    batch_results.update(item_results)
+                    batch_errors.update(item_errors)
+            results.update(batch_results)
+            errors.update(batch_errors)
+            if errors and self.bulk_atomic:
+                break
+
+        if errors and (self.bulk_atomic or not results):
+            self.session.rollback()
+            return Response(body={"errors": errors}, status_code=400)
+        self.commit()
+
+        body = {"results": [results[index] for index in sorted(results)]}
+        if errors:
+            body["errors"] = errors
+            status_code = 207
+        return Response(body=body, status_code=status_code)
+
+    def dump_objects(self, loaded):
+        schema = self.get_dump_schema(many=True)
+        data = self.dump(schema, [instance for _, instance in loaded])
+        return dict(zip([index for index, _ in loaded], data))
+
+    def get_pk_column(self):
+        return inspect(self.model).primary_key[0]
+
+
+class BulkCreateMixin(BulkMixin):
+    def create_objects(self, entries):
+        with self.measure("deserialize"):
+            loaded, errors = self.load_objects(entries, partial=False)
+        self.session.add_all([instance for _, instance in loaded])
+        self.session.flush()
+        return self.dump_objects(loaded), errors
+
+    def post(self, request, *args, **kwargs):
+        return self.write_bulk(self.create_objects, status_code=201)
+
+
+class BulkUpdateMixin(BulkMixin):
+    '''Partially updates the objects identified by each item's primary key.'''
+    def update_objects(self, entries):
+        pk_column = self.get_pk_column()
+        pk_name = inspect(self.model).get_property_by_column(pk_column).key
+        errors = {}
+        pks = {}
+        for index, data in entries:
+            if not isinstance(data, dict) or data.get(pk_name) is None:
+                errors[index] = {pk_name: ["Missing data for required field."]}
+                continue
+            try:
+                pks[index] = coerce_to_column(pk_column, data[pk_name])
+            except (TypeError, ValueError):
+                errors[index] = {pk_name: ["Invalid primary key."]}
+
+        # Fetch the batch in one query, so loading finds every object in the identity map
+        found = {
+            getattr(instance, pk_name): instance
+            for instance in self.session.query(self.model).filter(
+                pk_column.in_(list(pks.values())), *self.get_permission_clauses()
+            )
+        }
+        existing = []
+        for index, data in entries:
+            if index not in pks:
+                continue
+            if pks[index] in found:
+                existing.append((index, data))
+            else:
+                errors[index] = {pk_name: ["Not found."]}
+
+        loaded = []
+        if existing:
+            with self.measure("deserialize"):
+                loaded, load_errors = self.load_objects(existing, partial=True)
+            errors.update(load_errors)
+        self.session.flush()
+        return self.dump_objects(loaded), errors
+
+    def patch(self, request, *args, **kwargs):
+        return self.write_bulk(self.update_objects)
+
+
+class BulkDeleteMixin(BulkMixin):
+    '''
+    Deletes the objects whose primary keys are listed, with one ``DELETE`` per batch.
+
+    The rows are deleted directly in the database, so ORM cascades and events don't
+    run (database ``ON DELETE`` rules still apply).
+    '''
+    def delete_objects(self, entries):
+        pk_column = self.get_pk_column()
+        errors = {}
+        pks = {}
+        for index, pk in entries:
+            try:
+                pks[index] = coerce_to_column(pk_column, pk)
+            except (TypeError, ValueError):
+                errors[index] = {"_schema": ["Invalid primary key."]}
+        if not pks:
+            return {}, errors
+
+        where = [pk_column.in_(list(pks.values())), *self.get_permission_clauses()]
+        if self.session.get_bind().dialect.delete_returning:
+            statement = delete(self.model).where(*where).returning(pk_column)
+            deleted = set(self.session.scalars(
+                statement, execution_options={"synchronize_session": False}
+            ))
+        else:
+            deleted = set(self.session.scalars(select(pk_column).where(*where)))
+            self.session.execute(
+                delete(self.model).where(pk_column.in_(deleted)),
+                execution_options={"synchronize_session": False},
+            )
+
+        results = {}
+        for index, pk in pks.items():
+            if pk in deleted:
+                results[index] = pk if isinstance(pk, (int, str)) else str(pk)
+            else:
+                errors[index] = {"_schema": ["Not found."]}
+        return results, errors
+
+    def delete(self, request, *args, **kwargs):
+        return self.write_bulk(self.delete_objects)
+
+
 class RetrieveView(SingleObjectMixin, RetrieveMixin, APIView):
     allowed_methods = ("get", )
 
@@ -232,9 +1114,21 @@ class ListView(ListMixin, APIView):
     allowed_methods = ("get", )
 
 
+class ExportView(ExportMixin, APIView):
+    allowed_methods = ("get", )
+
+
 class CreateView(CreateMixin, APIView):
     allowed_methods = ("post", )
 
 
 class CreateListView(CreateMixin, ListMixin, APIView):
     allowed_methods = ("get", "post")
+
+
+class BulkCreateView(BulkCreateMixin, APIView):
+    allowed_methods = ("post", )
+
+
+class BulkView(BulkCreateMixin, BulkUpdateMixin, BulkDeleteMixin, APIView):
+    allowed_methods = ("post", "patch", "delete")
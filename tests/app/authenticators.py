@@ -1,9 +1,34 @@
-from chalice_plus.authenticators import CognitoAuthenticator
+import os
+
+from chalice_plus.authenticators import (
+    CognitoAuthenticator, FileKeySource, UserCache, VerifiedCognitoAuthenticator
+)
 
 from .models import User
 
+JWKS_PATH = os.path.join(os.path.dirname(__file__), "jwks.json")
+ISSUER = "https://cognito-idp.eu-west-1.amazonaws.com/eu-west-1_test"
+
 
 class CustomCognitoAuthenticator(CognitoAuthenticator):
     def get_user(self):
         if self.user_id:
             return self.session.get(User, self.user_id)
+
+
+class CachedCognitoAuthenticator(CustomCognitoAuthenticator):
+    user_cache = UserCache(attributes=["id", "username", "is_superuser"])
+
+
+CachedCognitoAuthenticator.user_cache.invalidate_on_change(User)
+
+
+class VerifiedAuthenticator(VerifiedCognitoAuthenticator):
+    key_source = FileKeySource(JWKS_PATH)
+    issuer = ISSUER
+    client_ids = ["test-client"]
+    token_use = "access"
+
+    def get_user(self):
+        if self.user_id:
+            return self.session.get(User, self.user_id)
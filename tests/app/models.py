@@ -29,6 +29,9 @@ class Book(Base):
     created_date = Column(DateTime, default=datetime.utcnow, nullable=False)
     created_by_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     created_by = relationship("User", backref="books")
+    updated_date = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
 
     def __repr__(self):
         return f"<Book ({self.title})>"
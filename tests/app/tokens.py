@@ -0,0 +1,50 @@
+import base64
+import hashlib
+import json
+import time
+
+from chalice_plus.authenticators import SHA256_DIGEST_INFO
+
+# A 2048 bit RSA key used to sign tokens in tests, matching the key in jwks.json
+KEY_ID = "test-key"
+N = int(
+    "28800186682031786912976512241914296881463574004584919366353964495054343316815965"
+    "35242854465493314584568974944496260543004394021278637639177264515604495329650374"
+    "98646113564624150047040380522094464147401732074390304428535237247625151334600594"
+    "59130218367388092465720246942625076804011141963038238484042076637406198657709249"
+    "44661950510739865829442542020384711729579896226546137531468043370741478509567889"
+    "69629087388609206943329444854316545396096674524937986762858545842409463808274970"
+    "44668001167661339996929251405106588834521622703359085908837411551064358696015695"
+    "466463339877609987486806206216425291182716465222986058687"
+)
+D = int(
+    "82418710228040063407369041472313752233371886179713774313131300502730397928938375"
+    "29712946198380626979201233667092995786204344090983848653855012586807804737414404"
+    "51517136869940023823525998549198418463542653013593872096247673005967577594402269"
+    "18532622103600054044979665137087952676996043077464968303127873923821182538171107"
+    "98411386116945089157123529997411888956657226303256466514812954289759203695587796"
+    "14604521110934312838171505651665947879979498748103456556826366272908025701041606"
+    "30929553811023062888123210233096797728292868171434241560230942650977938112176748"
+    "6769435293618807368727255990077165383105253123909648817"
+)
+
+
+def base64url_encode(value):
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode("ascii")
+
+
+def sign(message):
+    size = (N.bit_length() + 7) // 8
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+    encoded = b"\x00\x01" + b"\xff" * (size - len(digest_info) - 3) + b"\x00" + digest_info
+    return pow(int.from_bytes(encoded, "big"), D, N).to_bytes(size, "big")
+
+
+def make_token(kid=KEY_ID, alg="RS256", expires_in=3600, **claims):
+    header = {"alg": alg, "kid": kid, "typ": "JWT"}
+    payload = {"exp": int(time.time()) + expires_in, **claims}
+    signing_input = ".".join(
+        base64url_encode(json.dumps(part).encode("utf-8")) for part in (header, payload)
+    )
+    signature = sign(signing_input.encode("ascii"))
+    return f"{signing_input}.{base64url_encode(signature)}"
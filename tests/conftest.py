@@ -2,18 +2,43 @@ import pytest
 
 from chalice import Chalice, CognitoUserPoolAuthorizer
 from chalice.test import Client
-from chalice_plus.permissions import IsAdmin, IsAuthenticated, IsOwner, IsOwnerOrAdmin
+from chalice_plus.cache import CachePolicy, MemoryBackend
+from chalice_plus.pagination import CursorPagination, LimitOffsetPagination
+from chalice_plus.permissions import (
+    IsAdmin,
+    IsAdminClaim,
+    IsAuthenticated,
+    IsAuthenticatedClaim,
+    IsOwner,
+    IsOwnerClaim,
+    IsOwnerOrAdmin,
+    IsOwnerOrAdminClaim,
+)
 from chalice_plus.urls import register_url
 from chalice_plus.views import (
-    CreateView, CreateListView, DeleteView, ListView, RetrieveView, UpdateView
+    BulkView,
+    CreateView,
+    CreateListView,
+    DeleteView,
+    ExportView,
+    ListView,
+    RetrieveUpdateDeleteView,
+    RetrieveUpdateView,
+    RetrieveView,
+    UpdateDeleteView,
+    UpdateView,
 )
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, or_
 from sqlalchemy.orm import Session
 
-from tests.app.authenticators import CustomCognitoAuthenticator
+from tests.app.authenticators import (
+    CachedCognitoAuthenticator, CustomCognitoAuthenticator, VerifiedAuthenticator
+)
 from tests.app.models import Base, Author, Book, User
 from tests.app.schemas import AuthorSchema, BookSchema
 
+pytest_plugins = ["chalice_plus.testing"]
+
 
 @pytest.fixture
 def setup_db(session):
@@ -22,7 +47,19 @@ def setup_db(session):
 
 @pytest.fixture
 def engine():
-    return create_engine("sqlite://")
+    engine = create_engine("sqlite://")
+
+    # pysqlite only starts transactions before DML, which breaks SAVEPOINTs; let
+    # SQLAlchemy emit BEGIN itself, as recommended by its SQLite documentation
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
 
 
 @pytest.fixture
@@ -31,6 +68,19 @@ def session(engine):
         yield session
 
 
+@pytest.fixture
+def queries(engine, populate_db):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement != "BEGIN":
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture
 def app(engine):
     app = Chalice(app_name="testclient")
@@ -99,6 +149,85 @@ def book_list_view(app):
     register_url(app, "books", BookListView.as_view())
 
 
+@pytest.fixture
+def book_list_view_limit_offset(app):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        pagination_class = LimitOffsetPagination
+        page_size = 2
+        max_page_size = 2
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def book_list_view_cursor(app):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        pagination_class = CursorPagination
+        page_size = 2
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def book_list_view_cursor_by_title(app):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        pagination_class = CursorPagination
+        page_size = 2
+        ordering = "-title"
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def book_list_view_fast(app):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        fast_serialization = True
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def book_list_view_fast_cursor(app):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        fast_serialization = True
+        pagination_class = CursorPagination
+        page_size = 2
+        ordering = "-title"
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def book_export_view(app):
+    class BookExportView(ExportView):
+        model = Book
+        schema_class = BookSchema
+        export_max_bytes = 20
+        export_batch_size = 2
+
+    register_url(app, "books/export", BookExportView.as_view())
+
+
+@pytest.fixture
+def book_export_view_ndjson(app):
+    class BookExportView(ExportView):
+        model = Book
+        schema_class = BookSchema
+        export_format = "ndjson"
+
+    register_url(app, "books/export", BookExportView.as_view())
+
+
 @pytest.fixture
 def book_create_view(app):
     class BookCreateView(CreateView):
@@ -129,6 +258,51 @@ def book_update_view(app):
     register_url(app, "books/{int:id}", BookUpdateView.as_view())
 
 
+@pytest.fixture
+def book_upsert_view(app):
+    class BookUpdateView(UpdateView):
+        model = Book
+        schema_class = BookSchema
+        allowed_methods = ("patch", "put")
+        upsert = True
+
+        def load_object(self, *args, **kwargs):
+            # Upserts have to set every NOT NULL column, even for existing books
+            obj = super().load_object(*args, **kwargs)
+            obj.created_by_id = 1
+            return obj
+
+    register_url(app, "books/{int:id}", BookUpdateView.as_view())
+
+
+@pytest.fixture
+def book_upsert_view_created_by(app):
+    class BookUpdateView(UpdateView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        allowed_methods = ("put",)
+        upsert = True
+
+        def load_object(self, *args, **kwargs):
+            obj = super().load_object(*args, **kwargs)
+            obj.created_by = self.authenticator.user
+            return obj
+
+    register_url(app, "books/{int:id}", BookUpdateView.as_view())
+
+
+@pytest.fixture
+def book_upsert_view_without_owner(app):
+    class BookUpdateView(UpdateView):
+        model = Book
+        schema_class = BookSchema
+        allowed_methods = ("put",)
+        upsert = True
+
+    register_url(app, "books/{int:id}", BookUpdateView.as_view())
+
+
 @pytest.fixture
 def book_delete_view(app):
     class BookDeleteView(DeleteView):
@@ -165,6 +339,35 @@ def author_detail_view_is_authenticated(app, authorizer):
     register_url(app, "authors/{int:id}", AuthorDetailView.as_view(), authorizer=authorizer)
 
 
+@pytest.fixture
+def author_detail_view_verified(app):
+    class AuthorDetailView(RetrieveView):
+        model = Author
+        schema_class = AuthorSchema
+        authenticator_class = VerifiedAuthenticator
+        permission_classes = {"get": [IsAuthenticated]}
+
+    register_url(app, "authors/{int:id}", AuthorDetailView.as_view())
+
+
+@pytest.fixture
+def book_create_view_cached_user(app):
+    CachedCognitoAuthenticator.user_cache.clear()
+
+    class BookCreateView(CreateView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CachedCognitoAuthenticator
+        permission_classes = {"post": [IsAdmin]}
+
+        def load_object(self, *args, **kwargs):
+            obj = super().load_object(*args, **kwargs)
+            obj.created_by = self.authenticator.user
+            return obj
+
+    register_url(app, "books", BookCreateView.as_view())
+
+
 @pytest.fixture
 def book_create_view_is_admin(app):
     class BookCreateView(CreateView):
@@ -201,3 +404,293 @@ def book_update_view_is_owner_or_admin(app):
         permission_classes = {"patch": [IsOwnerOrAdmin]}
 
     register_url(app, "books/{int:id}", BookUpdateView.as_view())
+
+
+@pytest.fixture
+def author_detail_view_is_authenticated_claim(app):
+    class AuthorDetailView(RetrieveView):
+        model = Author
+        schema_class = AuthorSchema
+        authenticator_class = CustomCognitoAuthenticator
+        permission_classes = {"get": [IsAuthenticatedClaim]}
+
+    register_url(app, "authors/{int:id}", AuthorDetailView.as_view())
+
+
+@pytest.fixture
+def book_create_view_is_admin_claim(app):
+    class BookCreateView(CreateView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        permission_classes = {"post": [IsAdminClaim]}
+
+        def load_object(self, *args, **kwargs):
+            obj = super().load_object(*args, **kwargs)
+            obj.created_by_id = self.authenticator.user_id
+            return obj
+
+    register_url(app, "books", BookCreateView.as_view())
+
+
+@pytest.fixture
+def book_update_view_is_owner_claim(app):
+    class BookUpdateView(UpdateView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        permission_classes = {"patch": [IsOwnerClaim]}
+
+    register_url(app, "books/{int:id}", BookUpdateView.as_view())
+
+
+@pytest.fixture
+def book_update_view_is_owner_or_admin_claim(app):
+    class BookUpdateView(UpdateView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        permission_classes = {"patch": [IsOwnerOrAdminClaim]}
+
+    register_url(app, "books/{int:id}", BookUpdateView.as_view())
+
+
+@pytest.fixture
+def book_list_view_is_owner_or_admin_claim(app):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        permission_classes = {"get": [IsOwnerOrAdminClaim]}
+        pagination_class = CursorPagination
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def book_list_view_owned_or_by_author(app):
+    class IsOwnerOrByEricCarle:
+        message = "User is not authenticated"
+
+        def has_permission(self, view):
+            return bool(view.authenticator.user_id)
+
+        def get_filter_clause(self, view):
+            return or_(view.get_owner_clause(view.authenticator.user_id), Book.author_id == 1)
+
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        permission_classes = {"get": [IsOwnerOrByEricCarle]}
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def book_list_view_filtered(app):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        filter_fields = {"author_id": ["exact", "in"], "id": ["gt", "lte"]}
+        search_fields = ("title", "^description")
+        ordering_fields = ("title", "id")
+        ordering = "id"
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def book_list_view_filtered_cursor(app):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        pagination_class = CursorPagination
+        page_size = 1
+        filter_fields = ("author_id",)
+        ordering_fields = ("title", "id")
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def count_strategy():
+    return "exact"
+
+
+@pytest.fixture
+def book_list_view_counted(app, count_strategy):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        pagination_class = LimitOffsetPagination
+        page_size = 1
+        filter_fields = ("author_id",)
+
+    BookListView.count_strategy = count_strategy
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def bulk_atomic():
+    return True
+
+
+@pytest.fixture
+def book_bulk_view(app, bulk_atomic):
+    class BookBulkView(BulkView):
+        model = Book
+        schema_class = BookSchema
+        bulk_batch_size = 2
+        bulk_max_items = 10
+
+        def load_objects(self, entries, partial):
+            loaded, errors = super().load_objects(entries, partial)
+            for _, instance in loaded:
+                # Books described as orphans are left without an owner, which fails to insert
+                if instance.created_by_id is None and instance.description != "orphan":
+                    instance.created_by_id = 1
+            return loaded, errors
+
+    BookBulkView.bulk_atomic = bulk_atomic
+    register_url(app, "books/bulk", BookBulkView.as_view())
+
+
+@pytest.fixture
+def book_direct_write_permissions():
+    return {}
+
+
+@pytest.fixture
+def book_direct_write_view(app, book_direct_write_permissions):
+    class BookUpdateDeleteView(UpdateDeleteView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        direct_writes = True
+
+    BookUpdateDeleteView.permission_classes = book_direct_write_permissions
+    register_url(app, "books/{int:id}", BookUpdateDeleteView.as_view())
+
+
+@pytest.fixture
+def book_direct_write_view_created_by(app):
+    class BookUpdateView(UpdateView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        direct_writes = True
+
+        def load_object(self, *args, **kwargs):
+            obj = super().load_object(*args, **kwargs)
+            obj.created_by = self.authenticator.user
+            return obj
+
+    register_url(app, "books/{int:id}", BookUpdateView.as_view())
+
+
+@pytest.fixture
+def book_detail_view_etag(app):
+    class BookDetailView(RetrieveView):
+        model = Book
+        schema_class = BookSchema
+        use_etags = True
+
+    register_url(app, "books/{int:id}", BookDetailView.as_view())
+
+
+@pytest.fixture
+def book_detail_view_versioned(app):
+    class BookDetailView(RetrieveUpdateView):
+        model = Book
+        schema_class = BookSchema
+        version_field = "updated_date"
+        last_modified_field = "updated_date"
+
+    register_url(app, "books/{int:id}", BookDetailView.as_view())
+
+
+@pytest.fixture
+def book_list_view_etag(app):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        pagination_class = LimitOffsetPagination
+        count_strategy = "exact"
+        use_etags = True
+
+    register_url(app, "books", BookListView.as_view())
+
+
+@pytest.fixture
+def cache_policy():
+    return CachePolicy(backend=MemoryBackend())
+
+
+@pytest.fixture
+def book_cached_views(app, cache_policy):
+    class BookCreateListView(CreateListView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+
+        def load_object(self, *args, **kwargs):
+            obj = super().load_object(*args, **kwargs)
+            obj.created_by_id = 1
+            return obj
+
+    class BookDetailView(RetrieveUpdateDeleteView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+
+    BookCreateListView.cache_policy = cache_policy
+    BookDetailView.cache_policy = cache_policy
+    register_url(app, "books", BookCreateListView.as_view())
+    register_url(app, "books/{int:id}", BookDetailView.as_view())
+
+
+@pytest.fixture
+def book_views_instrumented(app):
+    class BookCreateListView(CreateListView):
+        model = Book
+        schema_class = BookSchema
+        instrument = True
+
+        def load_object(self, *args, **kwargs):
+            obj = super().load_object(*args, **kwargs)
+            obj.created_by_id = 1
+            return obj
+
+    class BookDetailView(RetrieveView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        permission_classes = {"get": [IsAuthenticated]}
+        instrument = True
+
+    register_url(app, "books", BookCreateListView.as_view())
+    register_url(app, "books/{int:id}", BookDetailView.as_view())
+
+
+@pytest.fixture
+def n_plus_one_mode():
+    return None
+
+
+@pytest.fixture
+def book_views_lazy(app, n_plus_one_mode):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        eager_load_depth = 0
+
+    class AuthorDetailView(RetrieveView):
+        model = Author
+        schema_class = AuthorSchema
+        eager_load_depth = 0
+
+    BookListView.n_plus_one = n_plus_one_mode
+    AuthorDetailView.n_plus_one = n_plus_one_mode
+    register_url(app, "books", BookListView.as_view())
+    register_url(app, "authors/{int:id}", AuthorDetailView.as_view())
@@ -0,0 +1,163 @@
+import json
+import pytest
+
+from chalice.app import UnauthorizedError
+from chalice_plus import authenticators
+from chalice_plus.authenticators import StaticKeySource
+
+from tests.app.authenticators import (
+    ISSUER, CachedCognitoAuthenticator, VerifiedAuthenticator
+)
+from tests.app.models import Book, User
+from tests.app.tokens import make_token
+from tests.functional.test_permissions import get_token
+
+CLAIMS = {"sub": "1", "iss": ISSUER, "client_id": "test-client", "token_use": "access"}
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    VerifiedAuthenticator.token_cache.clear()
+
+
+@pytest.fixture
+def verifications(monkeypatch):
+    calls = []
+    verify_rs256 = authenticators.verify_rs256
+
+    def counting_verify_rs256(*args):
+        calls.append(args)
+        return verify_rs256(*args)
+
+    monkeypatch.setattr(authenticators, "verify_rs256", counting_verify_rs256)
+    return calls
+
+
+def get(client, token):
+    return client.http.get("authors/1", headers={"Authorization": f"Bearer {token}"})
+
+
+@pytest.mark.usefixtures("author_detail_view_verified")
+def test_verified_token(client):
+    response = get(client, make_token(**CLAIMS))
+    assert response.status_code == 200
+    assert response.json_body["name"] == "Eric Carle"
+
+
+@pytest.mark.usefixtures("author_detail_view_verified")
+def test_verified_token_is_cached(client, verifications):
+    token = make_token(**CLAIMS)
+    assert get(client, token).status_code == 200
+    assert get(client, token).status_code == 200
+    assert len(verifications) == 1
+
+
+@pytest.mark.usefixtures("author_detail_view_verified")
+def test_tampered_token(client):
+    header, _, signature = make_token(**CLAIMS).split(".")
+    _, payload, _ = make_token(**{**CLAIMS, "sub": "2"}).split(".")
+    response = get(client, f"{header}.{payload}.{signature}")
+    assert response.status_code == 401
+
+
+@pytest.mark.usefixtures("author_detail_view_verified")
+@pytest.mark.parametrize("token", [
+    make_token(expires_in=-10, **CLAIMS),
+    make_token(**{**CLAIMS, "iss": "https://example.com"}),
+    make_token(**{**CLAIMS, "client_id": "other-client"}),
+    make_token(**{**CLAIMS, "token_use": "id"}),
+    make_token(kid="unknown-key", **CLAIMS),
+    make_token(kid=["test-key"], **CLAIMS),
+    make_token(kid={"id": "test-key"}, **CLAIMS),
+    make_token(kid=None, **CLAIMS),
+    make_token(alg="HS256", **CLAIMS),
+    "not-a-token",
+])
+def test_invalid_token(client, token):
+    response = get(client, token)
+    assert response.status_code == 401
+    assert len(VerifiedAuthenticator.token_cache) == 0
+
+
+@pytest.mark.parametrize("key", [
+    {"kid": "test-key", "kty": "RSA"},
+    {"kid": "test-key", "kty": "RSA", "n": 12345, "e": "AQAB"},
+    {"kid": "test-key", "kty": "RSA", "n": "not base64!", "e": "AQAB"},
+    {"kid": "test-key", "kty": "RSA", "n": "", "e": ""},
+])
+def test_malformed_key(key):
+    class MalformedKeyAuthenticator(VerifiedAuthenticator):
+        key_source = StaticKeySource({"keys": [key]})
+
+    authenticator = MalformedKeyAuthenticator(None, None)
+    with pytest.raises(UnauthorizedError):
+        authenticator._verify_jwt(make_token(**CLAIMS))
+
+
+@pytest.mark.usefixtures("author_detail_view_verified")
+def test_no_token(client):
+    response = client.http.get("authors/1")
+    assert response.status_code == 403
+
+
+def test_key_source_refreshes_unknown_kid():
+    loads = []
+
+    class CountingKeySource(StaticKeySource):
+        def load(self):
+            loads.append(1)
+            return super().load()
+
+    key_source = CountingKeySource({"keys": [{"kid": "a", "kty": "RSA"}]})
+    assert key_source.get_key("a")["kid"] == "a"
+    assert key_source.get_key("a")["kid"] == "a"
+    assert len(loads) == 1
+
+    # Unknown key ids only trigger a reload once per refresh interval
+    assert key_source.get_key("b") is None
+    assert len(loads) == 1
+    key_source._loaded_at -= key_source.refresh_interval + 1
+    assert key_source.get_key("b") is None
+    assert len(loads) == 2
+
+
+def create_book(client, user_id, title):
+    token = get_token(user_id=user_id)
+    return client.http.post(
+        "books",
+        headers={"Authorization": token, "Content-Type": "application/json"},
+        body=json.dumps({"title": title, "description": title, "author_id": 2}),
+    )
+
+
+def user_queries(queries):
+    return [statement for statement in queries if "FROM users" in statement]
+
+
+@pytest.mark.usefixtures("book_create_view_cached_user")
+def test_user_cache(client, queries, session):
+    assert create_book(client, 1, "IT").status_code == 201
+    uncached = len(user_queries(queries))
+    queries.clear()
+
+    # The user is no longer loaded to check permissions
+    response = create_book(client, 1, "Misery")
+    assert response.status_code == 201
+    assert len(user_queries(queries)) == uncached - 1
+    assert response.json_body["created_by"] == {"id": 1, "username": "monkey"}
+    assert session.get(Book, response.json_body["id"]).created_by_id == 1
+
+
+@pytest.mark.usefixtures("book_create_view_cached_user")
+def test_user_cache_invalidated_on_change(client, session):
+    assert create_book(client, 1, "IT").status_code == 201
+
+    session.get(User, 1).is_superuser = False
+    session.commit()
+    assert create_book(client, 1, "Misery").status_code == 403
+
+
+@pytest.mark.usefixtures("book_create_view_cached_user")
+def test_user_cache_skips_unknown_users(client):
+    assert create_book(client, 99, "IT").status_code == 403
+    assert len(CachedCognitoAuthenticator.user_cache.cache) == 0
@@ -0,0 +1,29 @@
+from benchmarks.compare import compare
+from benchmarks.run import run
+
+
+def test_run():
+    results = run([5], iterations=2, warmup=1)
+    assert results["registration"]["median_us"] > 0
+    assert results["list[rows=5]"]["status_code"] == 200
+    assert results["list[rows=5]"]["queries"] == 1
+    assert results["create[rows=5]"]["status_code"] == 201
+    assert results["delete[rows=5]"]["status_code"] == 204
+
+
+def test_compare():
+    before = {
+        "list": {"median_us": 100, "queries": 1},
+        "create": {"median_us": 100, "queries": 2},
+        "update": {"median_us": 100, "queries": 2},
+        "removed": {"median_us": 100, "queries": 1},
+    }
+    after = {
+        "list": {"median_us": 105, "queries": 1},
+        "create": {"median_us": 150, "queries": 2},
+        "update": {"median_us": 90, "queries": 3},
+        "added": {"median_us": 100, "queries": 1},
+    }
+    rows, regressions = compare(before, after, threshold=10)
+    assert regressions == ["create", "update"]
+    assert [row[0] for row in rows] == ["added", "create", "list", "removed", "update"]
@@ -0,0 +1,104 @@
+import pytest
+
+from chalice import Chalice
+from chalice.test import Client
+from chalice_plus.db import (
+    LambdaEngine, create_lambda_engine, get_lambda_engine_options, get_pool_stats
+)
+from chalice_plus.urls import register_url
+from chalice_plus.views import RetrieveView
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool, QueuePool
+
+from tests.app.models import Base, Book, User
+from tests.app.schemas import BookSchema
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'db.sqlite'}"
+
+
+@pytest.fixture
+def lambda_engine(database_url):
+    lambda_engine = LambdaEngine(database_url)
+    yield lambda_engine
+    lambda_engine.dispose()
+
+
+@pytest.fixture
+def lambda_app(lambda_engine):
+    app = Chalice(app_name="testclient")
+    app.engine = lambda_engine
+
+    class BookDetailView(RetrieveView):
+        model = Book
+        schema_class = BookSchema
+
+    register_url(app, "books/{int:id}", BookDetailView.as_view())
+    return app
+
+
+def test_lambda_engine_is_created_on_first_use(lambda_engine):
+    assert not lambda_engine.created
+    assert lambda_engine.get_pool_stats()["connects"] == 0
+    Base.metadata.create_all(bind=lambda_engine.engine)
+    assert lambda_engine.created
+
+
+def test_lambda_engine_reuses_connection_across_requests(lambda_app, lambda_engine):
+    Base.metadata.create_all(bind=lambda_engine.engine)
+    with Session(lambda_engine.engine) as session:
+        session.add(User(id=1, username="monkey"))
+        session.commit()
+
+    with Client(lambda_app) as client:
+        for _ in range(3):
+            assert client.http.get("books/1").status_code == 404
+
+    stats = get_pool_stats(lambda_engine)
+    assert stats["pool"] == "QueuePool"
+    assert stats["connects"] == 1
+    assert stats["checkouts"] == 5
+    assert stats["checked_out"] == 0
+
+
+def test_lambda_engine_url_callable(database_url):
+    lambda_engine = LambdaEngine(lambda: database_url)
+    assert str(lambda_engine.engine.url) == database_url
+
+
+def test_create_lambda_engine_pool_settings(database_url):
+    engine = create_lambda_engine(database_url)
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 1
+    assert engine.pool._max_overflow == 0
+    assert engine.pool._pre_ping
+    assert engine.pool._recycle == 300
+    assert get_pool_stats(engine)["checked_out"] == 0
+
+
+def test_create_lambda_engine_proxy(database_url):
+    engine = create_lambda_engine(database_url, proxy=True)
+    # The connection to the proxy is kept, as opening one costs more than the query
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 1
+    assert engine.pool._max_overflow == 0
+    assert engine.pool._recycle == 60
+
+
+def test_lambda_engine_options_proxy_prepared_statements():
+    url = "postgresql+psycopg://user@proxy/db"
+    options = get_lambda_engine_options(url, proxy=True)
+    assert options["connect_args"] == {"prepare_threshold": None}
+    options = get_lambda_engine_options(url, proxy=True, connect_args={"sslmode": "require"})
+    assert options["connect_args"] == {"prepare_threshold": None, "sslmode": "require"}
+    assert "connect_args" not in get_lambda_engine_options(url)
+    assert "connect_args" not in get_lambda_engine_options(
+        "postgresql+psycopg2://user@proxy/db", proxy=True
+    )
+
+
+def test_create_lambda_engine_memory_database():
+    engine = create_lambda_engine("sqlite://")
+    assert not isinstance(engine.pool, (NullPool, QueuePool))
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+from chalice_plus.deploy_utils.files import LAMBDA_FILES
+
+# Slow to import and only needed by some requests, so imported when they are used
+LAZY_MODULES = (
+    "six",
+    "sqlite3",
+    "sqlalchemy.dialects.postgresql",
+    "sqlalchemy.dialects.sqlite",
+    "urllib.request",
+)
+# What chalice_plus adds to a cold start (its modules and the dependencies they import
+# beyond the baseline's), relative to importing the baseline: about 6% currently, while
+# importing the postgresql dialect eagerly would add another 10%.
+BASELINE_MODULES = "chalice, sqlalchemy.orm, marshmallow"
+IMPORT_TIME_BUDGET = 0.12
+RUNS = 5
+
+SCRIPT = '''
+import time
+start = time.perf_counter()
+import {baseline}
+baseline = time.perf_counter() - start
+start = time.perf_counter()
+import {modules}
+print(baseline, time.perf_counter() - start)
+'''
+
+
+def run_imports():
+    '''
+    Import the baseline, then the Lambda runtime modules, in new interpreters.
+
+    Returns the lowest ratio of the runtime modules' cumulative import time to the
+    baseline's over ``RUNS`` runs, and the modules that were imported.
+    '''
+    modules = [
+        f"chalice_plus.{filename[:-3]}" for filename in LAMBDA_FILES if filename != "__init__.py"
+    ]
+    script = SCRIPT.format(baseline=BASELINE_MODULES, modules=", ".join(modules))
+    command = [sys.executable, "-X", "importtime", "-c", script]
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    # The first run compiles the bytecode, which deployed packages should already have
+    subprocess.run(command, capture_output=True, check=True, env=env)
+
+    ratios = []
+    for _ in range(RUNS):
+        result = subprocess.run(command, capture_output=True, text=True, check=True, env=env)
+        baseline, runtime = (float(value) for value in result.stdout.split())
+        ratios.append(runtime / baseline)
+
+    imported = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            imported.add(line.rsplit("|", 1)[1].strip())
+    return min(ratios), imported
+
+
+def test_import_time():
+    ratio, imported = run_imports()
+    assert not [module for module in LAZY_MODULES if module in imported]
+    assert ratio < IMPORT_TIME_BUDGET, (
+        f"Importing chalice_plus takes {ratio:.0%} of the time it takes to import "
+        f"{BASELINE_MODULES}, over the {IMPORT_TIME_BUDGET:.0%} budget"
+    )
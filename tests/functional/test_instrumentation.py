@@ -0,0 +1,98 @@
+import json
+import pytest
+
+from chalice_plus.instrumentation import RequestMetrics, assert_max_queries
+
+from tests.functional.test_permissions import get_token
+
+
+def parse_server_timing(header):
+    timings = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        timings[name] = dict(param.split("=", 1) for param in params)
+    return timings
+
+
+@pytest.mark.usefixtures("book_views_instrumented")
+def test_server_timing(app, client):
+    app.debug = True
+    response = client.http.get("books/1", headers={"Authorization": get_token("1")})
+    assert response.status_code == 200
+    timings = parse_server_timing(response.headers["Server-Timing"])
+    assert set(timings) == {"auth", "load", "serialize", "db", "total"}
+    # The user and the book
+    assert timings["db"]["desc"] == '"2 queries"'
+    assert float(timings["total"]["dur"]) >= float(timings["serialize"]["dur"])
+
+
+@pytest.mark.usefixtures("book_views_instrumented")
+def test_server_timing_write(app, client):
+    app.debug = True
+    response = client.http.post(
+        "books",
+        headers={"Content-Type": "application/json"},
+        body=json.dumps({"title": "The Cat in the Hat", "description": "A cat", "author_id": 2}),
+    )
+    assert response.status_code == 201
+    timings = parse_server_timing(response.headers["Server-Timing"])
+    assert {"deserialize", "commit", "serialize", "db", "total"} <= set(timings)
+
+
+@pytest.mark.usefixtures("book_views_instrumented")
+def test_emf_log(app, client, capsys):
+    response = client.http.get("books")
+    assert "Server-Timing" not in response.headers
+    record = json.loads(capsys.readouterr().out)
+    metrics = record["_aws"]["CloudWatchMetrics"][0]
+    assert metrics["Namespace"] == "ChalicePlus"
+    assert metrics["Dimensions"] == [["View"]]
+    assert {"Name": "QueryCount", "Unit": "Count"} in metrics["Metrics"]
+    assert record["View"] == "BookCreateListView"
+    assert record["Method"] == "GET"
+    assert record["StatusCode"] == 200
+    assert record["QueryCount"] == 1
+    assert record["TotalTime"] >= record["DbTime"]
+
+
+@pytest.mark.usefixtures("book_views_instrumented")
+def test_emf_log_error(client, capsys):
+    response = client.http.get("books/1")
+    assert response.status_code == 403
+    record = json.loads(capsys.readouterr().out)
+    assert record["StatusCode"] == 403
+    assert record["View"] == "BookDetailView"
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_not_instrumented(app, client, capsys):
+    app.debug = True
+    response = client.http.get("books")
+    assert "Server-Timing" not in response.headers
+    assert capsys.readouterr().out == ""
+
+
+def test_request_metrics():
+    metrics = RequestMetrics("view")
+    with metrics.phase("load"):
+        pass
+    with metrics.phase("load"):
+        pass
+    metrics.record_query(0.002)
+    metrics.record_query(0.001)
+    timings = metrics.get_timings()
+    assert set(timings) == {"load", "db", "total"}
+    assert timings["db"] == pytest.approx(3)
+    assert 'db;dur=3.00;desc="2 queries"' in metrics.get_server_timing()
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_assert_max_queries(client, engine, populate_db):
+    with assert_max_queries(engine, 1) as statements:
+        client.http.get("books")
+    assert len(statements) == 1
+
+    with pytest.raises(AssertionError, match="2 queries were run, expected at most 1"):
+        with assert_max_queries(engine, 1):
+            client.http.get("books")
+            client.http.get("books")
@@ -0,0 +1,125 @@
+import pytest
+
+from chalice_plus.masking import (
+    MAX_MASK_DEPTH,
+    MAX_MASK_LENGTH,
+    Mask,
+    MaskError,
+    ParseError,
+    mask_cache,
+    mask_schema,
+    parse_mask,
+)
+from tests.app.models import Author, Book
+from tests.app.schemas import AuthorSchema, BookSchema
+
+
+@pytest.fixture
+def book(session):
+    return session.get(Book, 2)
+
+
+def test_mask_schema_does_not_modify_schema(book):
+    schema = BookSchema()
+    dump_fields = dict(schema.dump_fields)
+    author_fields = dict(schema.dump_fields["author"].schema.dump_fields)
+
+    masked = mask_schema(schema, Mask("{title,author{name}}"))
+
+    assert masked.dump(book) == {"title": "The Shining", "author": {"name": "Stephen King"}}
+    assert schema.dump_fields == dump_fields
+    assert schema.dump_fields["author"].schema.dump_fields == author_fields
+    assert set(schema.dump(book).keys()) == {"id", "title", "description", "author", "created_by"}
+
+
+def test_masked_schemas_are_independent(book):
+    schema = BookSchema()
+    by_name = mask_schema(schema, Mask("{author{name}}"))
+    by_id = mask_schema(schema, Mask("{author{id}}"))
+
+    assert by_name.dump(book) == {"author": {"name": "Stephen King"}}
+    assert by_id.dump(book) == {"author": {"id": 2}}
+    assert by_name.dump(book) == {"author": {"name": "Stephen King"}}
+
+
+def test_masked_dump_fields_are_read_only():
+    masked = mask_schema(BookSchema(), Mask("{title}"))
+    with pytest.raises(TypeError):
+        masked.dump_fields["description"] = BookSchema().fields["description"]
+
+
+def test_mask_nested_collection(session):
+    author = session.get(Author, 2)
+    masked = mask_schema(AuthorSchema(), Mask("{books{title}}"))
+    assert masked.dump(author) == {"books": [{"title": "The Shining"}, {"title": "Carrie"}]}
+
+
+def test_mask_nested_on_plain_field(book):
+    masked = mask_schema(BookSchema(), Mask("{title{length}}"))
+    assert masked.dump(book) == {"title": "The Shining"}
+
+
+def test_parse_mask():
+    mask = Mask("{id,author{name,created_by{username}},title}")
+    assert mask == {
+        "id": True,
+        "author": {"name": True, "created_by": {"username": True}},
+        "title": True,
+    }
+    assert list(mask.keys()) == ["id", "author", "title"]
+    assert str(mask) == "{id,author{name,created_by{username}},title}"
+
+
+def test_parse_mask_is_cached():
+    mask_cache.clear()
+    mask = parse_mask("{id,title}")
+    assert parse_mask("{id,title}") is mask
+    assert parse_mask("id,title") is not mask
+    assert parse_mask("id,title") == mask
+
+
+def test_mask_is_immutable():
+    mask = Mask("{id,author{name}}")
+    with pytest.raises(TypeError):
+        mask["title"] = True
+    with pytest.raises(TypeError):
+        mask["author"].pop("name")
+    with pytest.raises(TypeError):
+        mask.update({"title": True})
+
+
+@pytest.mark.parametrize("mask_string", [
+    "{id,title",
+    "id}",
+    "{,id}",
+    "{{id}}",
+    "x" * (MAX_MASK_LENGTH + 1),
+    "a{" * (MAX_MASK_DEPTH + 1) + "b" + "}" * (MAX_MASK_DEPTH + 1),
+])
+def test_parse_invalid_mask(mask_string):
+    with pytest.raises(ParseError):
+        parse_mask(mask_string)
+
+
+def test_parse_blank_mask():
+    assert Mask("   ") == {}
+
+
+def test_apply_to_data():
+    mask = Mask("{id,author{name}}")
+    data = {"id": 1, "title": "Carrie", "author": {"id": 2, "name": "Stephen King"}}
+    assert mask.apply(data) == {"id": 1, "author": {"name": "Stephen King"}}
+    assert mask.apply([data, {"id": 2}]) == [
+        {"id": 1, "author": {"name": "Stephen King"}}, {"id": 2, "author": None}
+    ]
+    assert Mask("{id,*}").apply({"id": 1, "title": "Carrie"}) == {"id": 1, "title": "Carrie"}
+
+
+def test_apply_to_schema(book):
+    masked = Mask("{title,author{name}}").apply(BookSchema())
+    assert masked.dump(book) == {"title": "The Shining", "author": {"name": "Stephen King"}}
+
+    author_field = BookSchema().dump_fields["author"]
+    assert Mask("{name}").apply(author_field).schema.dump(book.author) == {"name": "Stephen King"}
+    with pytest.raises(MaskError):
+        Mask("{length}").apply(BookSchema().dump_fields["title"])
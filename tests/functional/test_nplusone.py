@@ -0,0 +1,68 @@
+import logging
+import pytest
+
+from chalice_plus.nplusone import NPlusOneDetector, NPlusOneError
+
+
+@pytest.mark.usefixtures("book_views_lazy")
+def test_detected(client):
+    with pytest.raises(NPlusOneError) as exc_info:
+        with NPlusOneDetector():
+            assert client.http.get("books").status_code == 200
+    message = str(exc_info.value)
+    assert (
+        "Book.author (serialized by BookSchema, field 'author') was lazy loaded 2 times"
+    ) in message
+    assert "FROM authors" in message
+
+
+@pytest.mark.usefixtures("book_views_lazy")
+def test_nested_field(client):
+    with NPlusOneDetector(mode="warn") as detector:
+        client.http.get("authors/2")
+    problems = detector.get_problems()
+    assert [(problem.model.__name__, problem.relationship) for problem in problems] == [
+        ("Book", "created_by")
+    ]
+    assert problems[0].field == "books.created_by"
+
+
+@pytest.mark.usefixtures("book_views_lazy")
+def test_single_lazy_load(client):
+    # Loading a relationship once is not an N+1
+    with NPlusOneDetector() as detector:
+        client.http.get("authors/1")
+    assert detector.get_problems() == []
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_eager_loaded(client, n_plus_one):
+    assert client.http.get("books").status_code == 200
+    assert n_plus_one.lazy_loads == {}
+
+
+@pytest.mark.parametrize("n_plus_one_mode", ["warn"])
+@pytest.mark.usefixtures("book_views_lazy")
+def test_view_warn(client, caplog):
+    with caplog.at_level(logging.WARNING, logger="chalice_plus.nplusone"):
+        response = client.http.get("books")
+    assert response.status_code == 200
+    assert "Book.author" in caplog.text
+
+
+@pytest.mark.parametrize("n_plus_one_mode", ["raise"])
+@pytest.mark.usefixtures("book_views_lazy")
+def test_view_raise(client):
+    assert client.http.get("books").status_code == 500
+
+
+@pytest.mark.usefixtures("book_views_lazy")
+def test_environment_variable(client, monkeypatch):
+    assert client.http.get("books").status_code == 200
+    monkeypatch.setenv("CHALICE_PLUS_N_PLUS_ONE", "raise")
+    assert client.http.get("books").status_code == 500
+
+
+def test_unknown_mode():
+    with pytest.raises(AssertionError):
+        NPlusOneDetector(mode="ignore")
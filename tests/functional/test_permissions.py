@@ -10,10 +10,12 @@ TOKEN_DATA_TEMPLATE = {
 }
 
 
-def get_token(user_id=None):
+def get_token(user_id=None, groups=None):
     token_data = TOKEN_DATA_TEMPLATE.copy()
     if user_id:
         token_data["sub"] = user_id
+    if groups:
+        token_data["cognito:groups"] = groups
     token_segment = base64.urlsafe_b64encode(json.dumps(token_data).encode("utf-8")).decode("utf-8")
     return f"Bearer X.{token_segment}"
 
@@ -189,3 +191,117 @@ def test_permissions_per_http_method(client):
     assert response.status_code == 201
     assert response.json_body["name"] == "Dr Seuss"
     assert response.json_body["created_by"] == {"id": 1, "username": "monkey"}
+
+
+def patch_book(client, book_id, token):
+    return client.http.patch(
+        f"books/{book_id}",
+        headers={"Authorization": token, "Content-Type": "application/json"},
+        body=json.dumps({"title": "The Shining (updated)"}),
+    )
+
+
+@pytest.mark.usefixtures("author_detail_view_is_authenticated_claim")
+def test_is_authenticated_claim(client, queries):
+    response = client.http.get("authors/1", headers={"Authorization": get_token(user_id="1")})
+    assert response.status_code == 200
+    # The first query loads the author, the user is never loaded for the permission check
+    assert "FROM authors" in queries[0]
+
+
+@pytest.mark.usefixtures("author_detail_view_is_authenticated_claim")
+def test_is_authenticated_claim_no_token(client):
+    response = client.http.get("authors/1")
+    assert response.status_code == 403
+    assert response.json_body["Message"] == "User is not authenticated"
+
+
+@pytest.mark.usefixtures("book_create_view_is_admin_claim")
+@pytest.mark.parametrize("groups, status_code", [(["admin"], 201), (["staff"], 403), (None, 403)])
+def test_is_admin_claim(client, queries, groups, status_code):
+    response = client.http.post(
+        "books",
+        headers={
+            "Authorization": get_token(user_id="1", groups=groups),
+            "Content-Type": "application/json",
+        },
+        body=json.dumps({"title": "IT", "description": "Clowns", "author_id": 2}),
+    )
+    assert response.status_code == status_code
+    if status_code == 403:
+        assert not queries
+
+
+@pytest.mark.usefixtures("book_update_view_is_owner_claim")
+def test_is_owner_claim(client, queries):
+    response = patch_book(client, 2, get_token(user_id="2"))
+    assert response.status_code == 200
+    assert "EXISTS" in queries[0]
+    assert "FROM books" in queries[1]
+
+
+@pytest.mark.usefixtures("book_update_view_is_owner_claim")
+@pytest.mark.parametrize("user_id", ["1", "99", "not-an-id"])
+def test_is_owner_claim_non_owner(client, queries, user_id):
+    response = patch_book(client, 2, get_token(user_id=user_id))
+    assert response.status_code == 403
+    assert response.json_body["Message"] == "User is not owner"
+    assert len(queries) <= 1
+
+
+@pytest.mark.usefixtures("book_update_view_is_owner_claim")
+def test_is_owner_claim_missing_object(client):
+    response = patch_book(client, 99, get_token(user_id="2"))
+    assert response.status_code == 403
+
+
+@pytest.mark.usefixtures("book_update_view_is_owner_or_admin_claim")
+def test_is_owner_or_admin_claim_admin(client, queries):
+    response = patch_book(client, 2, get_token(user_id="1", groups=["admin"]))
+    assert response.status_code == 200
+    assert "EXISTS" not in queries[0]
+
+
+@pytest.mark.usefixtures("book_update_view_is_owner_or_admin_claim")
+def test_is_owner_or_admin_claim_owner(client):
+    response = patch_book(client, 2, get_token(user_id="2"))
+    assert response.status_code == 200
+
+
+@pytest.mark.usefixtures("book_update_view_is_owner_or_admin_claim")
+def test_is_owner_or_admin_claim_non_owner_non_admin(client):
+    response = patch_book(client, 2, get_token(user_id="1"))
+    assert response.status_code == 403
+    assert response.json_body["Message"] == "User is not owner or admin"
+
+
+def list_book_ids(client, token):
+    response = client.http.get("books", headers={"Authorization": token})
+    assert response.status_code == 200
+    books = response.json_body
+    if isinstance(books, dict):
+        books = books["results"]
+    return [book["id"] for book in books]
+
+
+@pytest.mark.usefixtures("book_list_view_is_owner_or_admin_claim")
+def test_list_filtered_to_owner(client, queries):
+    assert list_book_ids(client, get_token(user_id="1")) == [1, 3]
+    assert "books.created_by_id = ?" in queries[0]
+
+
+@pytest.mark.usefixtures("book_list_view_is_owner_or_admin_claim")
+def test_list_not_filtered_for_admin(client):
+    assert list_book_ids(client, get_token(user_id="2", groups=["admin"])) == [1, 2, 3]
+
+
+@pytest.mark.usefixtures("book_list_view_is_owner_or_admin_claim")
+def test_list_filtered_no_token(client):
+    response = client.http.get("books")
+    assert response.status_code == 403
+
+
+@pytest.mark.usefixtures("book_list_view_owned_or_by_author")
+def test_list_custom_filter_clause(client):
+    assert list_book_ids(client, get_token(user_id="2")) == [1, 2]
+    assert list_book_ids(client, get_token(user_id="99")) == [1]
@@ -1 +1,60 @@
 # test allowed_methods
+import pytest
+
+from chalice_plus.db import LambdaEngine
+from sqlalchemy import event
+
+from tests.functional.test_permissions import get_token
+
+
+@pytest.fixture
+def checkouts(engine, populate_db):
+    counts = {"checkout": 0, "checkin": 0}
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counts["checkout"] += 1
+
+    def on_checkin(dbapi_connection, connection_record):
+        counts["checkin"] += 1
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+    yield counts
+    event.remove(engine, "checkout", on_checkout)
+    event.remove(engine, "checkin", on_checkin)
+
+
+@pytest.mark.usefixtures("book_detail_view")
+def test_invalid_url_parameter_does_not_create_engine(app, client):
+    app.engine = LambdaEngine("sqlite://")
+    response = client.http.get("books/the-shining")
+    assert response.status_code == 404
+    assert not app.engine.created
+
+
+@pytest.mark.usefixtures("author_create_list_view_is_admin")
+def test_forbidden_without_token_does_not_create_engine(app, client):
+    app.engine = LambdaEngine("sqlite://")
+    response = client.http.post("authors")
+    assert response.status_code == 403
+    assert not app.engine.created
+
+
+@pytest.mark.usefixtures("book_detail_view")
+def test_session_closed_after_request(client, checkouts):
+    response = client.http.get("books/1")
+    assert response.status_code == 200
+    assert checkouts == {"checkout": 1, "checkin": 1}
+
+
+@pytest.mark.usefixtures("book_create_view_is_admin_claim")
+def test_forbidden_by_claims_does_not_create_engine(app, client):
+    app.engine = LambdaEngine("sqlite://")
+    response = client.http.post(
+        "books",
+        headers={"Authorization": get_token(user_id="1"), "Content-Type": "application/json"},
+        body="{}",
+    )
+    assert response.status_code == 403
+    # The session, which would create the engine, is only built when it is used
+    assert not app.engine.created
@@ -0,0 +1,156 @@
+import json
+import pytest
+
+from tests.app.models import Book
+
+
+def send(client, method, items):
+    return getattr(client.http, method)(
+        "books/bulk",
+        headers={"Content-Type": "application/json", "X-Fields": "{id,title}"},
+        body=json.dumps(items),
+    )
+
+
+def book(title, description="A book"):
+    return {"title": title, "description": description, "author_id": 1}
+
+
+def titles(session):
+    return sorted(title for title, in session.query(Book.title))
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+def test_bulk_create(client, session):
+    response = send(client, "post", [book("IT"), book("Misery"), book("Cujo")])
+    assert response.status_code == 201
+    assert [item["title"] for item in response.json_body["results"]] == ["IT", "Misery", "Cujo"]
+    assert all(item["id"] for item in response.json_body["results"])
+    assert "errors" not in response.json_body
+    assert titles(session) == [
+        "Carrie", "Cujo", "IT", "Misery", "The Shining", "The Very Hungry Caterpillar"
+    ]
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+def test_bulk_create_batches(client, queries):
+    send(client, "post", [book("IT"), book("Misery"), book("Cujo")])
+    savepoints = [statement for statement in queries if statement.startswith("SAVEPOINT")]
+    assert len(savepoints) == 2
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+@pytest.mark.parametrize("body", [{"title": "IT"}, [book(str(i)) for i in range(11)]])
+def test_bulk_create_bad_payload(client, body):
+    response = send(client, "post", body)
+    assert response.status_code == 400
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+def test_bulk_create_atomic_invalid_item(client, session):
+    response = send(client, "post", [book("IT"), {"title": "Misery"}, book("Cujo")])
+    assert response.status_code == 400
+    assert list(response.json_body["errors"]) == ["1"]
+    assert len(titles(session)) == 3
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+def test_bulk_create_atomic_database_error(client, session):
+    response = send(client, "post", [book("IT"), book("Misery"), book("Cujo", "orphan")])
+    assert response.status_code == 400
+    assert list(response.json_body["errors"]) == ["2"]
+    assert len(titles(session)) == 3
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+@pytest.mark.parametrize("bulk_atomic", [False])
+def test_bulk_create_best_effort(client, session, bulk_atomic):
+    response = send(client, "post", [
+        book("IT", "orphan"), {"title": "Misery"}, book("Cujo"), book("Carrie 2"),
+    ])
+    assert response.status_code == 207
+    assert [item["title"] for item in response.json_body["results"]] == ["Cujo", "Carrie 2"]
+    assert response.json_body["errors"] == {
+        "0": {"_schema": ["Conflicts with the existing data."]},
+        "1": {
+            "author_id": ["Missing data for required field."],
+            "description": ["Missing data for required field."],
+        },
+    }
+    assert "Cujo" in titles(session)
+    assert "IT" not in titles(session)
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+@pytest.mark.parametrize("bulk_atomic", [False])
+def test_bulk_create_best_effort_all_invalid(client, bulk_atomic):
+    response = send(client, "post", [{"title": "IT"}])
+    assert response.status_code == 400
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+def test_bulk_update(client, session, queries):
+    response = send(client, "patch", [
+        {"id": 1, "title": "Caterpillar"},
+        {"id": 2, "title": "Shining"},
+        {"id": 3, "title": "Carrie!"},
+    ])
+    assert response.status_code == 200
+    assert response.json_body["results"] == [
+        {"id": 1, "title": "Caterpillar"},
+        {"id": 2, "title": "Shining"},
+        {"id": 3, "title": "Carrie!"},
+    ]
+    # One SELECT per batch, rather than one per item
+    assert len([statement for statement in queries if "FROM books" in statement]) == 2
+    assert titles(session) == ["Carrie!", "Caterpillar", "Shining"]
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+@pytest.mark.parametrize("bulk_atomic", [False])
+def test_bulk_update_best_effort(client, session, bulk_atomic):
+    response = send(client, "patch", [
+        {"id": 1, "title": "Caterpillar"},
+        {"id": 99, "title": "Missing"},
+        {"title": "No id"},
+        {"id": 3, "title": None},
+    ])
+    assert response.status_code == 207
+    assert response.json_body["results"] == [{"id": 1, "title": "Caterpillar"}]
+    assert response.json_body["errors"] == {
+        "1": {"id": ["Not found."]},
+        "2": {"id": ["Missing data for required field."]},
+        "3": {"title": ["Field may not be null."]},
+    }
+    assert titles(session) == ["Carrie", "Caterpillar", "The Shining"]
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+def test_bulk_delete(client, session):
+    response = client.http.delete(
+        "books/bulk", headers={"Content-Type": "application/json"}, body=json.dumps([1, 3]),
+    )
+    assert response.status_code == 200
+    assert response.json_body == {"results": [1, 3]}
+    assert titles(session) == ["The Shining"]
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+def test_bulk_delete_atomic_missing(client, session):
+    response = client.http.delete(
+        "books/bulk", headers={"Content-Type": "application/json"}, body=json.dumps([1, 99]),
+    )
+    assert response.status_code == 400
+    assert len(titles(session)) == 3
+
+
+@pytest.mark.usefixtures("book_bulk_view")
+@pytest.mark.parametrize("bulk_atomic", [False])
+def test_bulk_delete_best_effort(client, session, bulk_atomic):
+    response = client.http.delete(
+        "books/bulk", headers={"Content-Type": "application/json"}, body=json.dumps([1, 99, "x"]),
+    )
+    assert response.status_code == 207
+    assert response.json_body["results"] == [1]
+    assert set(response.json_body["errors"]) == {"1", "2"}
+    assert titles(session) == ["Carrie", "The Shining"]
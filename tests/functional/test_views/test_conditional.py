@@ -0,0 +1,122 @@
+import json
+import pytest
+
+from chalice_plus.conditional import http_date, is_not_modified
+
+from tests.app.models import Book
+
+
+@pytest.mark.usefixtures("book_detail_view_etag")
+def test_etag(client):
+    response = client.http.get("books/1")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('"')
+    assert response.json_body["title"] == "The Very Hungry Caterpillar"
+
+    response = client.http.get("books/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.usefixtures("book_detail_view_etag")
+def test_etag_changes_with_body(client, session):
+    etag = client.http.get("books/1").headers["ETag"]
+    assert client.http.get("books/2").headers["ETag"] != etag
+    masked = client.http.get("books/1", headers={"X-Fields": "{id}", "If-None-Match": etag})
+    assert masked.status_code == 200
+
+    session.get(Book, 1).title = "The Very Hungry Caterpillar (revised)"
+    session.commit()
+    response = client.http.get("books/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.usefixtures("book_detail_view_versioned")
+def test_versioned(client, session):
+    response = client.http.get("books/1")
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('W/"')
+    last_modified = response.headers["Last-Modified"]
+    assert last_modified == http_date(session.get(Book, 1).updated_date)
+
+
+@pytest.mark.usefixtures("book_detail_view_versioned")
+def test_versioned_not_modified(client, queries):
+    etag = client.http.get("books/1").headers["ETag"]
+    queries.clear()
+
+    response = client.http.get("books/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    # Only the version was selected, the book was neither loaded nor serialized
+    assert len(queries) == 1
+    assert queries[0].startswith("SELECT books.updated_date \nFROM books")
+
+
+@pytest.mark.usefixtures("book_detail_view_versioned")
+def test_versioned_if_modified_since(client):
+    last_modified = client.http.get("books/1").headers["Last-Modified"]
+    response = client.http.get("books/1", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    response = client.http.get(
+        "books/1", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.usefixtures("book_detail_view_versioned")
+def test_versioned_modified(client):
+    etag = client.http.get("books/1").headers["ETag"]
+    client.http.patch(
+        "books/1",
+        headers={"Content-Type": "application/json"},
+        body=json.dumps({"title": "Revised"}),
+    )
+    response = client.http.get("books/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json_body["title"] == "Revised"
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.usefixtures("book_detail_view_versioned")
+def test_versioned_mask(client):
+    etag = client.http.get("books/1").headers["ETag"]
+    response = client.http.get("books/1", headers={"If-None-Match": etag, "X-Fields": "{id}"})
+    assert response.status_code == 200
+    assert response.json_body == {"id": 1}
+
+
+@pytest.mark.usefixtures("book_detail_view_versioned")
+def test_versioned_not_found(client):
+    response = client.http.get("books/99", headers={"If-None-Match": '"x"'})
+    assert response.status_code == 404
+
+
+@pytest.mark.usefixtures("book_list_view_etag")
+def test_list_etag(client):
+    response = client.http.get("books")
+    etag = response.headers["ETag"]
+    assert response.json_body["count"] == 3
+
+    response = client.http.get("books", headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert response.headers["X-Total-Count"] == "3"
+
+    response = client.http.get("books?limit=1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"if-none-match": "*"}, True),
+    ({"if-none-match": 'W/"abc"'}, True),
+    ({"if-none-match": '"abd"'}, False),
+    ({"if-none-match": '"abd"', "if-modified-since": "Sat, 01 Jan 2050 00:00:00 GMT"}, False),
+    ({"if-modified-since": "not a date"}, False),
+    ({}, False),
+])
+def test_is_not_modified(headers, expected):
+    assert is_not_modified(headers, etag='"abc"') is expected
@@ -0,0 +1,117 @@
+import json
+import pytest
+
+from chalice_plus.permissions import IsOwner, IsOwnerClaim
+
+from tests.app.models import Book
+from tests.functional.test_permissions import get_token
+
+OWNER_CLAIM = {"patch": [IsOwnerClaim], "delete": [IsOwnerClaim]}
+OWNER = {"patch": [IsOwner], "delete": [IsOwner]}
+
+
+def patch_book(client, book_id, data, token=None):
+    headers = {"Content-Type": "application/json", "X-Fields": "{id,title}"}
+    if token:
+        headers["Authorization"] = token
+    return client.http.patch(f"books/{book_id}", headers=headers, body=json.dumps(data))
+
+
+def delete_book(client, book_id, token=None):
+    headers = {"Authorization": token} if token else {}
+    return client.http.delete(f"books/{book_id}", headers=headers)
+
+
+@pytest.mark.usefixtures("book_direct_write_view")
+def test_direct_patch(client, queries, session):
+    response = patch_book(client, 2, {"title": "The Shining (PATCH)"})
+    assert response.status_code == 200
+    assert response.json_body == {"id": 2, "title": "The Shining (PATCH)"}
+    assert len(queries) == 1
+    assert queries[0].startswith("UPDATE books SET title=?")
+    assert "WHERE books.id = ?" in queries[0]
+    assert "RETURNING" in queries[0]
+    book = session.get(Book, 2)
+    assert book.title == "The Shining (PATCH)"
+    assert book.description == "Jack Torrance stays at the Overlook Hotel"
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.usefixtures("book_direct_write_view_created_by")
+def test_direct_patch_assigned_relationship(client, queries, session):
+    response = patch_book(client, 1, {"title": "Reassigned"}, get_token(user_id="2"))
+    assert response.status_code == 200
+    update = [statement for statement in queries if statement.startswith("UPDATE books")]
+    assert len(update) == 1
+    assert "created_by_id=?" in update[0]
+    assert not [statement for statement in queries if statement.startswith("SELECT books")]
+    assert session.get(Book, 1).created_by_id == 2
+
+
+@pytest.mark.usefixtures("book_direct_write_view")
+def test_direct_patch_not_found(client):
+    response = patch_book(client, 99, {"title": "Missing"})
+    assert response.status_code == 404
+
+
+@pytest.mark.usefixtures("book_direct_write_view")
+def test_direct_patch_invalid(client, queries):
+    response = patch_book(client, 2, {"title": None})
+    assert response.status_code == 400
+    assert not queries
+
+
+@pytest.mark.usefixtures("book_direct_write_view")
+def test_direct_delete(client, queries, session):
+    response = delete_book(client, 2)
+    assert response.status_code == 204
+    assert len(queries) == 1
+    assert queries[0].startswith("DELETE FROM books WHERE books.id = ? RETURNING")
+    assert session.get(Book, 2) is None
+
+
+@pytest.mark.usefixtures("book_direct_write_view")
+def test_direct_delete_not_found(client):
+    response = delete_book(client, 99)
+    assert response.status_code == 404
+
+
+@pytest.mark.usefixtures("book_direct_write_view")
+@pytest.mark.parametrize("book_direct_write_permissions", [OWNER_CLAIM])
+def test_direct_writes_owner(client, queries, session, book_direct_write_permissions):
+    token = get_token(user_id="2")
+    assert patch_book(client, 2, {"title": "Mine"}, token).status_code == 200
+    assert delete_book(client, 2, token).status_code == 204
+    # The ownership check is part of each write
+    assert len(queries) == 2
+    assert all("books.created_by_id = ?" in statement for statement in queries)
+
+
+@pytest.mark.usefixtures("book_direct_write_view")
+@pytest.mark.parametrize("book_direct_write_permissions", [OWNER_CLAIM])
+def test_direct_writes_non_owner(client, session, book_direct_write_permissions):
+    token = get_token(user_id="1")
+    assert patch_book(client, 2, {"title": "Not mine"}, token).status_code == 404
+    assert delete_book(client, 2, token).status_code == 404
+    assert session.get(Book, 2).title == "The Shining"
+
+
+@pytest.mark.usefixtures("book_direct_write_view")
+@pytest.mark.parametrize("book_direct_write_permissions", [OWNER_CLAIM])
+def test_direct_patch_empty_body(client, book_direct_write_permissions):
+    # Nothing is written, but the ownership check still applies
+    assert patch_book(client, 2, {}, get_token(user_id="1")).status_code == 404
+    response = patch_book(client, 2, {}, get_token(user_id="2"))
+    assert response.status_code == 200
+    assert response.json_body == {"id": 2, "title": "The Shining"}
+
+
+@pytest.mark.usefixtures("book_direct_write_view")
+@pytest.mark.parametrize("book_direct_write_permissions", [OWNER])
+def test_direct_writes_object_permission(client, queries, book_direct_write_permissions):
+    token = get_token(user_id=2)
+    assert patch_book(client, 1, {"title": "Not mine"}, token).status_code == 403
+    response = patch_book(client, 2, {"title": "Mine"}, token)
+    assert response.status_code == 200
+    # IsOwner needs the object, so it is loaded first
+    assert any(statement.startswith("SELECT books.id") for statement in queries)
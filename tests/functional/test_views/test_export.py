@@ -0,0 +1,43 @@
+import json
+import pytest
+
+
+@pytest.mark.usefixtures("book_export_view")
+def test_export_stops_at_max_bytes(client):
+    response = client.http.get("books/export", headers={"X-Fields": "{id}"})
+    assert response.status_code == 200
+    assert response.body == b'[{"id":1},{"id":2}]'
+    token = response.headers["X-Continuation-Token"]
+
+    response = client.http.get(f"books/export?continuation={token}", headers={"X-Fields": "{id}"})
+    assert response.status_code == 200
+    assert response.json_body == [{"id": 3}]
+    assert "X-Continuation-Token" not in response.headers
+
+
+@pytest.mark.usefixtures("book_export_view")
+def test_export_returns_at_least_one_row(client):
+    response = client.http.get("books/export", headers={"X-Fields": "{id,title}"})
+    assert response.status_code == 200
+    assert response.json_body == [{"id": 1, "title": "The Very Hungry Caterpillar"}]
+    assert "X-Continuation-Token" in response.headers
+
+
+@pytest.mark.usefixtures("book_export_view")
+def test_export_invalid_continuation(client):
+    response = client.http.get("books/export?continuation=abc")
+    assert response.status_code == 400
+
+
+@pytest.mark.usefixtures("book_export_view_ndjson")
+def test_export_ndjson(client):
+    response = client.http.get("books/export", headers={"X-Fields": "{id,author{name}}"})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    lines = response.body.decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": 1, "author": {"name": "Eric Carle"}},
+        {"id": 2, "author": {"name": "Stephen King"}},
+        {"id": 3, "author": {"name": "Stephen King"}},
+    ]
+    assert "X-Continuation-Token" not in response.headers
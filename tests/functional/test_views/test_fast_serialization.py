@@ -0,0 +1,93 @@
+import pytest
+
+from chalice_plus import serializers
+
+
+EXPECTED_BOOKS = [
+    {
+        "id": 1,
+        "title": "The Very Hungry Caterpillar",
+        "description": "The story of a very hungry caterpillar",
+        "author": {
+            "id": 1,
+            "name": "Eric Carle",
+            "description": "Writer and illustrator",
+            "created_by": {"id": 1, "username": "monkey"},
+        },
+        "created_by": {"id": 1, "username": "monkey"},
+    },
+    {
+        "id": 2,
+        "title": "The Shining",
+        "description": "Jack Torrance stays at the Overlook Hotel",
+        "author": {
+            "id": 2,
+            "name": "Stephen King",
+            "description": "King of Horror",
+            "created_by": {"id": 2, "username": "horse"},
+        },
+        "created_by": {"id": 2, "username": "horse"},
+    },
+    {
+        "id": 3,
+        "title": "Carrie",
+        "description": "About a girl",
+        "author": {
+            "id": 2,
+            "name": "Stephen King",
+            "description": "King of Horror",
+            "created_by": {"id": 2, "username": "horse"},
+        },
+        "created_by": {"id": 1, "username": "monkey"},
+    },
+]
+
+
+@pytest.mark.usefixtures("book_list_view_fast")
+def test_fast_serialization_nested_fields(client, queries):
+    response = client.http.get("books")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/json"
+    assert response.json_body == EXPECTED_BOOKS
+    assert len(queries) == 1
+
+
+@pytest.mark.usefixtures("book_list_view_fast")
+def test_fast_serialization_selects_row_tuples(client, queries):
+    response = client.http.get("books", headers={"X-Fields": "{id,title}"})
+    assert response.status_code == 200
+    assert response.json_body == [
+        {"id": 1, "title": "The Very Hungry Caterpillar"},
+        {"id": 2, "title": "The Shining"},
+        {"id": 3, "title": "Carrie"},
+    ]
+    assert queries == ["SELECT books.id AS books_id, books.title AS books_title \nFROM books"]
+
+
+@pytest.mark.usefixtures("book_list_view_fast")
+def test_fast_serialization_nested_field_mask(client):
+    response = client.http.get("books", headers={"X-Fields": "{title,author{name}}"})
+    assert response.status_code == 200
+    assert response.json_body == [
+        {"title": "The Very Hungry Caterpillar", "author": {"name": "Eric Carle"}},
+        {"title": "The Shining", "author": {"name": "Stephen King"}},
+        {"title": "Carrie", "author": {"name": "Stephen King"}},
+    ]
+
+
+@pytest.mark.usefixtures("book_list_view_fast_cursor")
+def test_fast_serialization_with_cursor_pagination(client):
+    response = client.http.get("books", headers={"X-Fields": "{id}"})
+    assert response.status_code == 200
+    assert response.json_body["results"] == [{"id": 1}, {"id": 2}]
+
+    response = client.http.get(response.json_body["next"], headers={"X-Fields": "{id}"})
+    assert response.json_body["results"] == [{"id": 3}]
+
+
+@pytest.mark.usefixtures("book_list_view_fast")
+def test_fast_serialization_without_orjson(client, monkeypatch):
+    monkeypatch.setattr(serializers, "orjson", None)
+    response = client.http.get("books")
+    assert response.status_code == 200
+    assert response.json_body == EXPECTED_BOOKS
@@ -0,0 +1,77 @@
+import pytest
+
+
+def get_ids(client, query):
+    response = client.http.get(f"books?{query}")
+    assert response.status_code == 200
+    books = response.json_body
+    if isinstance(books, dict):
+        books = books["results"]
+    return [book["id"] for book in books]
+
+
+@pytest.mark.usefixtures("book_list_view_filtered")
+@pytest.mark.parametrize("query, ids", [
+    ("author_id=2", [2, 3]),
+    ("author_id__in=1,3", [1]),
+    ("id__gt=1", [2, 3]),
+    ("id__gt=1&id__lte=2", [2]),
+    ("author_id=2&id__lte=2", [2]),
+    ("id=1", [1, 2, 3]),
+])
+def test_field_filter(client, query, ids):
+    assert get_ids(client, query) == ids
+
+
+@pytest.mark.usefixtures("book_list_view_filtered")
+@pytest.mark.parametrize("query", ["author_id=two", "author_id__in=1,x", "id__gt="])
+def test_field_filter_invalid_value(client, query):
+    response = client.http.get(f"books?{query}")
+    assert response.status_code == 400
+
+
+@pytest.mark.usefixtures("book_list_view_filtered")
+@pytest.mark.parametrize("query, ids", [
+    ("search=the", [1, 2]),
+    ("search=THE%20shin", [2]),
+    ("search=story", []),
+    ("search=About", [3]),
+    ("search=50%25", []),
+])
+def test_search_filter(client, query, ids):
+    assert get_ids(client, query) == ids
+
+
+@pytest.mark.usefixtures("book_list_view_filtered")
+def test_search_filter_prefix_query(client, queries):
+    get_ids(client, "search=Jack")
+    assert "books.description LIKE ?" in queries[0]
+
+
+@pytest.mark.usefixtures("book_list_view_filtered")
+@pytest.mark.parametrize("query, ids", [
+    ("", [1, 2, 3]),
+    ("ordering=title", [3, 2, 1]),
+    ("ordering=-id", [3, 2, 1]),
+    ("ordering=title,-id", [3, 2, 1]),
+])
+def test_ordering_filter(client, query, ids):
+    assert get_ids(client, query) == ids
+
+
+@pytest.mark.usefixtures("book_list_view_filtered")
+@pytest.mark.parametrize("query", ["ordering=description", "ordering=-author_id"])
+def test_ordering_filter_not_allowed(client, query):
+    response = client.http.get(f"books?{query}")
+    assert response.status_code == 400
+    assert response.json_body["Message"] == f"Invalid {query.replace('=', ': ')}"
+
+
+@pytest.mark.usefixtures("book_list_view_filtered_cursor")
+def test_cursor_pagination_follows_ordering(client):
+    response = client.http.get("books?ordering=-title&author_id=2")
+    assert [book["id"] for book in response.json_body["results"]] == [2]
+
+    response = client.http.get(response.json_body["next"])
+    assert [book["id"] for book in response.json_body["results"]] == [3]
+    assert response.json_body["next"] is None
@@ -78,3 +78,71 @@ def test_list_view_unknown_field_mask(client):
 def test_list_view_invalid_field_mask(client):
     response = client.http.get("books", headers={"X-Fields": "{{{/aaa/s*"})
     assert response.status_code == 400
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_list_view_field_mask_selects_masked_columns(client, queries):
+    response = client.http.get("books", headers={"X-Fields": "{id,title}"})
+    assert response.status_code == 200
+    assert len(queries) == 1
+    assert "books.title" in queries[0]
+    assert "books.description" not in queries[0]
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_list_view_nested_field_mask_selects_foreign_key(client, queries):
+    response = client.http.get("books", headers={"X-Fields": "{title,author{name}}"})
+    assert response.status_code == 200
+    assert "books.author_id" in queries[0]
+    assert "books.description" not in queries[0]
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_list_view_eager_loads_nested_relationships(client, queries):
+    response = client.http.get("books")
+    assert response.status_code == 200
+    assert len(response.json_body) == 3
+    assert len(queries) == 1
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_list_view_field_mask_skips_excluded_relationships(client, queries):
+    response = client.http.get("books", headers={"X-Fields": "{title,created_by{username}}"})
+    assert response.status_code == 200
+    assert len(queries) == 1
+    assert "authors" not in queries[0]
+    assert "users" in queries[0]
+
+
+@pytest.mark.usefixtures("author_create_list_view_is_admin")
+def test_list_view_eager_loads_nested_collections(client, queries):
+    response = client.http.get("authors")
+    assert response.status_code == 200
+    assert [len(a["books"]) for a in response.json_body] == [1, 2]
+    assert response.json_body[1]["books"][0]["created_by"] == {"id": 2, "username": "horse"}
+    assert len(queries) == 2
+
+
+@pytest.mark.usefixtures("author_create_list_view_is_admin")
+def test_list_view_nested_collection_field_mask(client, queries):
+    response = client.http.get("authors", headers={"X-Fields": "{name,books{title}}"})
+    assert response.status_code == 200
+    assert response.json_body == [
+        {"name": "Eric Carle", "books": [{"title": "The Very Hungry Caterpillar"}]},
+        {"name": "Stephen King", "books": [{"title": "The Shining"}, {"title": "Carrie"}]},
+    ]
+    assert len(queries) == 2
+    assert "books.description" not in queries[1]
+
+
+@pytest.mark.usefixtures("author_create_list_view_is_admin")
+def test_list_view_field_mask_only_collections(client, queries):
+    response = client.http.get("authors", headers={"X-Fields": "{books{title}}"})
+    assert response.status_code == 200
+    assert response.json_body == [
+        {"books": [{"title": "The Very Hungry Caterpillar"}]},
+        {"books": [{"title": "The Shining"}, {"title": "Carrie"}]},
+    ]
+    assert len(queries) == 2
+    # Only the primary key is selected, to load the books with
+    assert " ".join(queries[0].split()).startswith("SELECT authors.id AS authors_id FROM")
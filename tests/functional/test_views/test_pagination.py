@@ -0,0 +1,126 @@
+import pytest
+
+from chalice_plus.pagination import LimitOffsetPagination, get_explain_statement
+from sqlalchemy.dialects import postgresql
+
+from tests.app.models import Book
+
+
+def get_titles(response):
+    return [b["title"] for b in response.json_body["results"]]
+
+
+@pytest.mark.usefixtures("book_list_view_limit_offset")
+def test_limit_offset_first_page(client):
+    response = client.http.get("books", headers={"X-Fields": "{title}"})
+    assert response.status_code == 200
+    assert get_titles(response) == ["The Very Hungry Caterpillar", "The Shining"]
+    assert response.json_body["next"] == "books?limit=2&offset=2"
+    assert response.json_body["previous"] is None
+
+
+@pytest.mark.usefixtures("book_list_view_limit_offset")
+def test_limit_offset_last_page(client):
+    response = client.http.get("books?limit=2&offset=2")
+    assert response.status_code == 200
+    assert get_titles(response) == ["Carrie"]
+    assert response.json_body["next"] is None
+    assert response.json_body["previous"] == "books?limit=2"
+
+
+@pytest.mark.usefixtures("book_list_view_limit_offset")
+def test_limit_offset_ordered_by_primary_key(client, queries):
+    client.http.get("books?offset=1")
+    assert " ".join(queries[-1].split()).endswith("ORDER BY books.id LIMIT ? OFFSET ?")
+
+
+@pytest.mark.usefixtures("book_list_view_limit_offset")
+def test_limit_offset_max_page_size(client):
+    response = client.http.get("books?limit=50")
+    assert response.status_code == 200
+    assert len(response.json_body["results"]) == 2
+
+
+@pytest.mark.usefixtures("book_list_view_limit_offset")
+def test_limit_offset_invalid_params(client):
+    assert client.http.get("books?limit=abc").status_code == 400
+    assert client.http.get("books?limit=0").status_code == 400
+    assert client.http.get("books?offset=-1").status_code == 400
+
+
+@pytest.mark.usefixtures("book_list_view_cursor")
+def test_cursor_pagination_next_and_previous(client):
+    response = client.http.get("books")
+    assert response.status_code == 200
+    assert get_titles(response) == ["The Very Hungry Caterpillar", "The Shining"]
+    assert response.json_body["previous"] is None
+
+    response = client.http.get(response.json_body["next"])
+    assert response.status_code == 200
+    assert get_titles(response) == ["Carrie"]
+    assert response.json_body["next"] is None
+
+    response = client.http.get(response.json_body["previous"])
+    assert response.status_code == 200
+    assert get_titles(response) == ["The Very Hungry Caterpillar", "The Shining"]
+    assert response.json_body["previous"] is None
+    assert response.json_body["next"] is not None
+
+
+@pytest.mark.usefixtures("book_list_view_cursor_by_title")
+def test_cursor_pagination_descending_ordering(client):
+    response = client.http.get("books")
+    assert get_titles(response) == ["The Very Hungry Caterpillar", "The Shining"]
+
+    response = client.http.get(response.json_body["next"])
+    assert get_titles(response) == ["Carrie"]
+
+
+@pytest.mark.usefixtures("book_list_view_cursor")
+def test_cursor_pagination_invalid_cursor(client):
+    response = client.http.get("books?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+@pytest.mark.usefixtures("book_list_view_counted")
+@pytest.mark.parametrize("count_strategy", ["exact", "estimated", "capped"])
+def test_count(client, count_strategy):
+    response = client.http.get("books")
+    assert response.json_body["count"] == 3
+    assert response.headers["X-Total-Count"] == "3"
+
+    response = client.http.get("books?author_id=2&offset=1")
+    assert [book["id"] for book in response.json_body["results"]] == [3]
+    assert response.json_body["count"] == 2
+
+
+@pytest.mark.usefixtures("book_list_view_counted")
+@pytest.mark.parametrize("count_strategy", [None])
+def test_count_none(client, count_strategy, queries):
+    response = client.http.get("books")
+    assert "count" not in response.json_body
+    assert "X-Total-Count" not in response.headers
+    assert not [statement for statement in queries if "count(" in statement]
+
+
+@pytest.mark.usefixtures("book_list_view_counted")
+@pytest.mark.parametrize("count_strategy", ["capped"])
+def test_count_capped(client, monkeypatch, queries):
+    monkeypatch.setattr(LimitOffsetPagination, "count_cap", 2)
+    response = client.http.get("books")
+    assert response.json_body["count"] == "2+"
+    assert response.headers["X-Total-Count"] == "2+"
+    assert "LIMIT" in [statement for statement in queries if "count(" in statement][0]
+
+
+def test_explain_statement_renders_expanding_parameters(session):
+    queryset = session.query(Book).filter(
+        Book.author_id.in_([1, 2]),
+        Book.title.icontains("100%", autoescape=True),
+    )
+    sql, params = get_explain_statement(queryset.statement, postgresql.dialect())
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "POSTCOMPILE" not in sql
+    assert "books.author_id IN (%(author_id_1_1)s::INTEGER, %(author_id_1_2)s::INTEGER)" in sql
+    assert "books.title ILIKE" in sql
+    assert params == {"author_id_1_1": 1, "author_id_1_2": 2, "title_1": "100/%"}
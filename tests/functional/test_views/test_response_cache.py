@@ -0,0 +1,206 @@
+import pytest
+
+from chalice_plus.cache import CachePolicy, MemoryBackend, SQLiteBackend, invalidate
+from chalice_plus.permissions import IsOwnerClaim
+from chalice_plus.urls import register_url
+from chalice_plus.views import ListView, RetrieveView
+
+from tests.app.authenticators import CustomCognitoAuthenticator
+from tests.app.models import Author, Book
+from tests.app.schemas import BookSchema
+from tests.functional.test_permissions import get_token
+
+
+@pytest.mark.usefixtures("book_cached_views")
+def test_cached_list(client, queries):
+    response = client.http.get("books")
+    assert response.status_code == 200
+    assert queries
+
+    queries.clear()
+    cached = client.http.get("books")
+    assert cached.status_code == 200
+    assert cached.json_body == response.json_body
+    assert cached.headers["Content-Type"] == "application/json"
+    assert queries == []
+
+
+@pytest.mark.usefixtures("book_cached_views")
+def test_cache_key(client, queries):
+    client.http.get("books/1")
+    client.http.get("books?a=1&b=2")
+    queries.clear()
+
+    assert client.http.get("books/1").json_body["id"] == 1
+    # The query string is normalized
+    client.http.get("books?b=2&a=1")
+    assert queries == []
+
+    assert client.http.get("books/2").json_body["id"] == 2
+    assert len(queries) == 1
+    masked = client.http.get("books/1", headers={"X-Fields": "{id}"})
+    assert masked.json_body == {"id": 1}
+    assert len(queries) == 2
+
+
+@pytest.mark.usefixtures("book_cached_views")
+def test_errors_not_cached(client, queries):
+    assert client.http.get("books/404").status_code == 404
+    assert client.http.get("books/404").status_code == 404
+    assert len(queries) == 2
+
+
+@pytest.mark.usefixtures("book_cached_views")
+def test_invalidated_on_write(client):
+    titles = [book["title"] for book in client.http.get("books").json_body]
+    assert client.http.get("books/1").json_body["title"] == "The Very Hungry Caterpillar"
+
+    response = client.http.post(
+        "books",
+        headers={"Content-Type": "application/json"},
+        body='{"title": "Brown Bear", "description": "About a bear", "author_id": 1}',
+    )
+    assert response.status_code == 201
+    assert [book["title"] for book in client.http.get("books").json_body] == [
+        *titles, "Brown Bear"
+    ]
+
+    client.http.patch(
+        "books/1", headers={"Content-Type": "application/json"}, body='{"title": "Changed"}'
+    )
+    assert client.http.get("books/1").json_body["title"] == "Changed"
+
+    client.http.delete("books/1")
+    assert client.http.get("books/1").status_code == 404
+
+
+@pytest.mark.usefixtures("book_cached_views")
+def test_failed_write_does_not_invalidate(client, queries):
+    client.http.get("books/1")
+    response = client.http.patch(
+        "books/1", headers={"Content-Type": "application/json"}, body='{"title": 1}'
+    )
+    assert response.status_code == 400
+    queries.clear()
+    client.http.get("books/1")
+    assert queries == []
+
+
+@pytest.mark.usefixtures("book_cached_views")
+def test_invalidate(client, queries, session):
+    client.http.get("books/1")
+    session.get(Book, 1).title = "Changed"
+    session.commit()
+    # Writes outside the views aren't seen until invalidated
+    assert client.http.get("books/1").json_body["title"] != "Changed"
+
+    invalidate(Book)
+    assert client.http.get("books/1").json_body["title"] == "Changed"
+
+
+@pytest.mark.parametrize("cache_policy", [
+    CachePolicy(backend=MemoryBackend(), depends_on=[Author]),
+])
+@pytest.mark.usefixtures("book_cached_views")
+def test_depends_on(client, queries):
+    client.http.get("books/1")
+    queries.clear()
+    invalidate(Author)
+    client.http.get("books/1")
+    assert len(queries) == 1
+
+
+def test_etag_on_cached_response(app, client, queries):
+    class BookDetailView(RetrieveView):
+        model = Book
+        schema_class = BookSchema
+        use_etags = True
+        cache_policy = CachePolicy(backend=MemoryBackend())
+
+    register_url(app, "books/{int:id}", BookDetailView.as_view())
+    etag = client.http.get("books/1").headers["ETag"]
+    response = client.http.get("books/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert len(queries) == 1
+
+
+@pytest.mark.parametrize("cache_policy", [
+    CachePolicy(backend=MemoryBackend(), vary_on=["user"]),
+])
+@pytest.mark.usefixtures("book_cached_views")
+def test_vary_on_user(client, queries):
+    client.http.get("books/1", headers={"Authorization": get_token("1")})
+    client.http.get("books/1", headers={"Authorization": get_token("1")})
+    assert len(queries) == 1
+    client.http.get("books/1", headers={"Authorization": get_token("2")})
+    client.http.get("books/1")
+    assert len(queries) == 3
+
+
+@pytest.mark.parametrize("cache_policy", [
+    CachePolicy(backend=MemoryBackend(), vary_on=["groups"]),
+])
+@pytest.mark.usefixtures("book_cached_views")
+def test_vary_on_groups(client, queries):
+    client.http.get("books/1", headers={"Authorization": get_token("1", ["admin", "staff"])})
+    client.http.get("books/1", headers={"Authorization": get_token("2", ["staff", "admin"])})
+    assert len(queries) == 1
+    client.http.get("books/1", headers={"Authorization": get_token("3", ["staff"])})
+    assert len(queries) == 2
+
+
+def test_vary_on_permission_clauses(app, client, queries):
+    class BookListView(ListView):
+        model = Book
+        schema_class = BookSchema
+        authenticator_class = CustomCognitoAuthenticator
+        permission_classes = {"get": [IsOwnerClaim]}
+        cache_policy = CachePolicy(backend=MemoryBackend())
+
+    register_url(app, "books", BookListView.as_view())
+    first = client.http.get("books", headers={"Authorization": get_token("1")}).json_body
+    second = client.http.get("books", headers={"Authorization": get_token("2")}).json_body
+    assert {book["id"] for book in first} == {1, 3}
+    assert {book["id"] for book in second} == {2}
+    assert client.http.get("books", headers={"Authorization": get_token("1")}).json_body == first
+    assert len(queries) == 2
+
+
+def test_vary_on_unknown():
+    with pytest.raises(AssertionError):
+        CachePolicy(vary_on=["tenant"])
+
+
+def test_memory_backend_ttl():
+    backend = MemoryBackend()
+    backend.set("key", {"body": "[]"}, ttl=-1)
+    assert backend.get("key") is None
+    backend.set("key", {"body": "[]"}, ttl=60)
+    assert backend.get("key") == {"body": "[]"}
+
+
+def test_sqlite_backend_shared(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+
+    first.set("key", {"body": "[]", "headers": {}}, ttl=60)
+    assert second.get("key") == {"body": "[]", "headers": {}}
+    second.set("expired", {"body": "[]"}, ttl=-1)
+    assert first.get("expired") is None
+
+    assert second.get_generation("books") == 0
+    assert first.incr_generation("books") == 1
+    assert first.incr_generation("books") == 2
+    assert second.get_generation("books") == 2
+
+    second.delete("key")
+    assert first.get("key") is None
+
+
+@pytest.mark.usefixtures("book_cached_views")
+def test_sqlite_backend_views(client, queries, tmp_path, cache_policy):
+    cache_policy.backend = SQLiteBackend(str(tmp_path / "cache.sqlite"))
+    client.http.get("books/1")
+    client.http.get("books/1")
+    assert len(queries) == 1
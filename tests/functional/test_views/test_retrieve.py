@@ -48,3 +48,12 @@ def test_detail_view_unknown_object(client):
 def test_detail_view_invalid_id(client):
     response = client.http.get("books/the-shining")
     assert response.status_code == 404
+
+
+@pytest.mark.usefixtures("book_detail_view")
+def test_detail_view_field_mask_selects_masked_columns(client, queries):
+    response = client.http.get("books/1", headers={"X-Fields": "{id,title}"})
+    assert response.status_code == 200
+    assert response.json_body == {"id": 1, "title": "The Very Hungry Caterpillar"}
+    assert len(queries) == 1
+    assert "books.description" not in queries[0]
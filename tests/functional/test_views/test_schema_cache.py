@@ -0,0 +1,80 @@
+import json
+import pytest
+
+from chalice_plus.cache import LRUCache
+from chalice_plus.views import schema_cache
+from tests.app.schemas import BookSchema
+
+
+@pytest.fixture
+def schema_inits(monkeypatch):
+    schema_cache.clear()
+    inits = []
+    original_init = BookSchema.__init__
+
+    def counting_init(self, *args, **kwargs):
+        inits.append(kwargs)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(BookSchema, "__init__", counting_init)
+    yield inits
+    schema_cache.clear()
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_schema_reused_across_requests(client, schema_inits):
+    for _ in range(3):
+        response = client.http.get("books")
+        assert response.status_code == 200
+    assert schema_inits == [{"many": True}]
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_masked_schema_cached_per_mask(client, schema_inits):
+    for mask in ("{id,title}", "{title}", "{id,title}", "{title}"):
+        response = client.http.get("books", headers={"X-Fields": mask})
+        assert response.status_code == 200
+        assert set(response.json_body[0].keys()) == set(mask.strip("{}").split(","))
+    # Masked schemas are views over the one cached schema
+    assert schema_inits == [{"many": True}]
+
+
+@pytest.mark.usefixtures("book_list_view")
+def test_masked_schema_does_not_affect_unmasked_response(client, schema_inits):
+    response = client.http.get("books", headers={"X-Fields": "{title,author{name}}"})
+    assert response.json_body[0] == {
+        "title": "The Very Hungry Caterpillar",
+        "author": {"name": "Eric Carle"},
+    }
+    response = client.http.get("books")
+    assert set(response.json_body[0]["author"].keys()) == {
+        "id", "name", "description", "created_by"
+    }
+
+
+def test_schema_cache_is_bounded():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+@pytest.mark.usefixtures("book_update_view")
+def test_load_schema_not_shared(client, schema_inits):
+    for title in ("First", "Second"):
+        response = client.http.patch(
+            "books/1",
+            headers={"Content-Type": "application/json"},
+            body=json.dumps({"title": title}),
+        )
+        assert response.status_code == 200
+        assert response.json_body["title"] == title
+    # A load schema per request, plus the cached dump schema
+    assert schema_inits == [{"many": False}, {"many": False}, {"many": False}]
+    dump_schema = schema_cache.get((BookSchema, False, None))
+    assert dump_schema.instance is None
+    assert dump_schema.session is None
@@ -1,6 +1,15 @@
 import json
 import pytest
 
+from sqlalchemy import delete, event, inspect
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from chalice_plus.views import get_postgresql_upsert
+
+from tests.app.models import Book
+from tests.functional.test_permissions import get_token
+
 
 @pytest.mark.usefixtures("book_update_view")
 def test_update_view_existing_object_bad_data(client, app):
@@ -167,3 +176,112 @@ def test_update_view_new_object_with_field_mask(client):
         "description": "New description (with field mask)",
         "author": {"name": "Eric Carle"}
     }
+
+
+def put_book(client, book_id, data, headers=None):
+    return client.http.put(
+        f"books/{book_id}",
+        headers={"Content-Type": "application/json", **(headers or {})},
+        body=json.dumps(data),
+    )
+
+
+@pytest.mark.usefixtures("book_upsert_view")
+def test_upsert_existing_object(client, queries, session):
+    response = put_book(client, 2, {
+        "title": "The Shining (PUT)",
+        "description": "New description",
+        "author_id": 2,
+    })
+    assert response.status_code == 200
+    assert response.json_body["title"] == "The Shining (PUT)"
+    assert response.json_body["author"]["id"] == 2
+    # The book is never selected before being written
+    assert queries[0].startswith("INSERT INTO books")
+    assert queries[1].startswith("UPDATE books")
+    assert session.get(Book, 2).title == "The Shining (PUT)"
+
+
+@pytest.mark.usefixtures("book_upsert_view")
+def test_upsert_new_object(client, queries, session):
+    response = put_book(client, 50, {
+        "title": "The Pig with a Fig",
+        "description": "New description",
+        "author_id": 1,
+    }, headers={"X-Fields": "{id,title}"})
+    assert response.status_code == 201
+    assert response.json_body == {"id": 50, "title": "The Pig with a Fig"}
+    assert len(queries) == 1
+    assert session.get(Book, 50).created_date is not None
+
+
+@pytest.mark.usefixtures("book_upsert_view")
+def test_upsert_incomplete_data(client, queries):
+    response = put_book(client, 2, {"title": "The Shining (updated)"})
+    assert response.status_code == 400
+    assert not queries
+
+
+@pytest.mark.usefixtures("book_upsert_view_without_owner")
+def test_upsert_missing_required_column(client, session):
+    # created_by_id is NOT NULL, which is checked before the conflict is resolved
+    response = put_book(client, 2, {
+        "title": "The Shining (PUT)",
+        "description": "New description",
+        "author_id": 2,
+    })
+    assert response.status_code == 400
+    assert session.get(Book, 2).title == "The Shining"
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.usefixtures("book_upsert_view_created_by")
+def test_upsert_assigned_relationship(client, queries, session):
+    data = {"title": "The Shining (PUT)", "description": "New description", "author_id": 2}
+    response = put_book(client, 2, data, headers={"Authorization": get_token(user_id="1")})
+    assert response.status_code == 200
+    assert response.json_body["created_by"]["id"] == 1
+    # Written from the relationship's foreign key, without loading the book
+    assert not [statement for statement in queries if statement.startswith("SELECT books")]
+
+    response = put_book(client, 50, data, headers={"Authorization": get_token(user_id="2")})
+    assert response.status_code == 201
+    assert session.get(Book, 2).created_by_id == 1
+    assert session.get(Book, 50).created_by_id == 2
+
+
+@pytest.mark.usefixtures("book_upsert_view")
+def test_upsert_object_deleted_concurrently(client, session):
+    deleted = []
+
+    def delete_before_update(orm_execute_state):
+        if orm_execute_state.is_update and not deleted:
+            deleted.append(True)
+            orm_execute_state.session.execute(delete(Book).where(Book.id == 2))
+
+    event.listen(Session, "do_orm_execute", delete_before_update)
+    try:
+        response = put_book(client, 2, {
+            "title": "The Shining (PUT)",
+            "description": "New description",
+            "author_id": 2,
+        })
+    finally:
+        event.remove(Session, "do_orm_execute", delete_before_update)
+    assert deleted
+    assert response.status_code == 201
+    assert session.get(Book, 2).title == "The Shining (PUT)"
+
+
+def test_postgresql_upsert_applies_onupdate():
+    mapper = inspect(Book)
+    values = {"id": 2, "title": "The Shining (PUT)"}
+    statement = get_postgresql_upsert(Book, values, [mapper.attrs.title])
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (id) DO UPDATE SET title = excluded.title, updated_date = " in sql
+    assert "created_date = " not in sql.split("DO UPDATE")[1]
+
+    values["updated_date"] = "2020-01-01"
+    statement = get_postgresql_upsert(Book, values, [mapper.attrs.title, mapper.attrs.updated_date])
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "updated_date = excluded.updated_date" in sql